@@ -1,22 +1,23 @@
-import json
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
-from tensorflow.keras.models import Model
-from tensorflow.keras.layers import Input, Dense
-from tensorflow.keras.optimizers import Adam
 from openai import OpenAI
 from loadenv import load_env
+from sensor_store import SensorStore
+from anomaly_registry import AnomalyModelRegistry
+from anomaly_autoencoders import AUTOENCODER_BACKEND, KerasAutoencoder, make_autoencoder, save_autoencoder, load_autoencoder
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import joblib
 import os
 load_env()
 
 
 
 # Data Loading and Preprocessing
-def load_machine_data(json_data):
-    records = json_data["MILL-001"]
+def load_machine_data(json_data, machine_id="MILL-001"):
+    records = json_data[machine_id]
     data = []
     for rec in records:
         row = {"timestamp": rec["timestamp"]}
@@ -29,63 +30,281 @@ def load_machine_data(json_data):
 
 
 # Anomaly Detection Methods
-def z_score_detection(df, threshold=3):
-    z_scores = (df - df.mean()) / df.std()
-    return (np.abs(z_scores) > threshold).any(axis=1).astype(int)
+def autoencoder_model(input_dim):
+    """Compiled Keras 8-3-8 autoencoder; TensorFlow is imported on first call"""
+    return KerasAutoencoder(input_dim).model
 
 
-def isolation_forest_detection(df):
-    iso = IsolationForest(contamination=0.05, random_state=42)
-    preds = iso.fit_predict(df)
-    return (preds == -1).astype(int)
+# Fitted, reusable detectors
+DEFAULT_WEIGHTS = {"z_score": 1.0, "isolation_forest": 1.0, "autoencoder": 1.0}
 
+_member_executor = None
 
-def autoencoder_detection(df, epochs=30):
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(df)
-    
-    ae = autoencoder_model(input_dim=X_scaled.shape[1])
-    ae.fit(X_scaled, X_scaled, epochs=epochs, batch_size=8, verbose=0)
+def _member_pool():
+    global _member_executor
+    if _member_executor is None:
+        _member_executor = ThreadPoolExecutor(max_workers=len(DEFAULT_WEIGHTS), thread_name_prefix="anomaly-member")
+    return _member_executor
 
-    recon = ae.predict(X_scaled)
-    mse = np.mean(np.square(X_scaled - recon), axis=1)
-    threshold = np.percentile(mse, 95)
-    return (mse > threshold).astype(int)
 
+def _reset_member_pool():
+    # A forked child inherits the executor but not its threads; submitting to it would hang
+    global _member_executor
+    _member_executor = None
 
-def autoencoder_model(input_dim):
-    input_layer = Input(shape=(input_dim,))
-    encoded = Dense(8, activation="relu")(input_layer)
-    bottleneck = Dense(3, activation="relu")(encoded)
-    decoded = Dense(8, activation="relu")(bottleneck)
-    output = Dense(input_dim, activation="linear")(decoded)
-    autoencoder = Model(inputs=input_layer, outputs=output)
-    autoencoder.compile(optimizer=Adam(0.001), loss='mse')
-    return autoencoder
 
+os.register_at_fork(after_in_child=_reset_member_pool)
 
-# Ensemble and Analysis
-def ensemble_anomaly_detection(df):
-    z = z_score_detection(df)
-    i = isolation_forest_detection(df)
-    a = autoencoder_detection(df)
-    
-    votes = z + i + a
-    return (votes >= 2).astype(int)  # Majority vote
 
+class MachineAnomalyDetector:
+    """
+    The three detectors fitted once on a machine's sensor history and reused for every
+    lookup. Scoring is vectorized: z-scores compare each reading with the rolling mean
+    and std of the readings before it, and the forest and autoencoder only run
+    inference, so checking a window around an incident takes milliseconds.
+    """
+    def __init__(self, z_threshold=3, rolling_window=12, min_periods=3, contamination=0.05,
+                 ae_epochs=30, ae_quantile=95, weights=None, vote_threshold=2, ae_backend=None):
+        # Default: one vote per member, anomalous when two of three agree (majority vote)
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+        self.vote_threshold = vote_threshold
+        self.z_threshold = z_threshold
+        self.rolling_window = rolling_window
+        self.min_periods = min_periods
+        self.contamination = contamination
+        self.ae_epochs = ae_epochs
+        self.ae_quantile = ae_quantile
+        # "numpy" by default; "tensorflow" loads the Keras implementation
+        self.ae_backend = ae_backend or AUTOENCODER_BACKEND
+        self.columns = None
+        self.mean_ = None
+        self.std_ = None
+        self.scaler = None
+        self.forest = None
+        self.autoencoder = None
+        self.ae_threshold = None
+
+    def fit(self, df):
+        self.columns = list(df.columns)
+        X = df.to_numpy(dtype=float)
+        self.mean_ = np.nan_to_num(np.nanmean(X, axis=0))
+        std = np.nanstd(X, axis=0, ddof=1) if len(X) > 1 else np.zeros(X.shape[1])
+        self.std_ = np.where(std > 0, std, 1.0)
+        X = self._fill_missing(X)
+
+        self.forest = IsolationForest(contamination=self.contamination, random_state=42).fit(X)
+
+        self.scaler = StandardScaler().fit(X)
+        X_scaled = self.scaler.transform(X)
+        self.autoencoder = make_autoencoder(X_scaled.shape[1], self.ae_backend)
+        self.autoencoder.fit(X_scaled, X_scaled, epochs=self.ae_epochs, batch_size=8, verbose=0)
+        self.ae_threshold = float(np.percentile(self._reconstruction_error(X_scaled), self.ae_quantile))
+        return self
+
+    def _fill_missing(self, X):
+        # Sensors that did not report take the baseline mean, i.e. count as normal
+        return np.where(np.isnan(X), self.mean_, X)
+
+    def _reconstruction_error(self, X_scaled):
+        recon = self.autoencoder.predict(X_scaled, verbose=0)
+        return np.mean(np.square(X_scaled - recon), axis=1)
+
+    def rolling_z_scores(self, X, history=None):
+        """
+        Z-score of every row of X against the mean and std of the `rolling_window`
+        readings before it (taken from `history` for the first rows). Rows with fewer
+        than `min_periods` earlier readings fall back to the fitted baseline.
+        """
+        history = np.empty((0, X.shape[1])) if history is None else history[-self.rolling_window:]
+        values = np.vstack([history, X])
+        offset = len(history)
+        # Prefix sums give every window's sum and sum of squares in O(1)
+        zero = np.zeros((1, values.shape[1]))
+        sums = np.vstack([zero, np.cumsum(values, axis=0)])
+        squares = np.vstack([zero, np.cumsum(values * values, axis=0)])
+
+        end = np.arange(offset, len(values))
+        count = np.minimum(end, self.rolling_window)
+        start = end - count
+        n = count[:, None].astype(float)
+        window_sum = sums[end] - sums[start]
+        window_squares = squares[end] - squares[start]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = window_sum / n
+            var = (window_squares - n * mean * mean) / (n - 1)
+        std = np.sqrt(np.clip(var, 0, None))
+
+        use_baseline = (count < self.min_periods)[:, None] | ~(std > 0)
+        mean = np.where(use_baseline, self.mean_, mean)
+        std = np.where(use_baseline, self.std_, std)
+        return (X - mean) / std
+
+    def score(self, df, history=None, weights=None, vote_threshold=None, parallel=True):
+        """
+        Flag each row of df with every detector and combine them with a weighted vote.
+        `history` holds the readings just before df, used to seed the rolling z-score.
+        Members run concurrently on a shared thread pool unless parallel is False.
+        """
+        weights = weights or self.weights
+        vote_threshold = self.vote_threshold if vote_threshold is None else vote_threshold
+        X = self._fill_missing(df[self.columns].to_numpy(dtype=float))
+        H = self._fill_missing(history[self.columns].to_numpy(dtype=float)) if history is not None and len(history) else None
+
+        members = {
+            "z_score": lambda: (np.abs(self.rolling_z_scores(X, H)) > self.z_threshold).any(axis=1),
+            "isolation_forest": lambda: self.forest.predict(X) == -1,
+            "autoencoder": lambda: self._reconstruction_error(self.scaler.transform(X))
+        }
+        if parallel:
+            futures = {name: _member_pool().submit(member) for name, member in members.items()}
+            outputs = {name: future.result() for name, future in futures.items()}
+        else:
+            outputs = {name: member() for name, member in members.items()}
+        mse = outputs["autoencoder"]
+        outputs["autoencoder"] = mse > self.ae_threshold
+
+        result = df.copy()
+        votes = np.zeros(len(df))
+        for name in members:
+            flags = outputs[name].astype(int)
+            result[name] = flags
+            votes += weights.get(name, 0.0) * flags
+        result["reconstruction_error"] = mse
+        result["vote"] = votes
+        result["anomaly"] = (votes >= vote_threshold).astype(int)
+        return result
+
+    def score_reading(self, x, mean=None, std=None):
+        """
+        Score a single reading (values in self.columns order) against a rolling mean and
+        std kept by the caller, falling back to the fitted baseline where they are missing.
+        Used by the streaming service, which cannot afford a DataFrame per reading.
+        """
+        x = self._fill_missing(np.asarray(x, dtype=float)[None, :])
+        if mean is None or std is None:
+            mean, std = self.mean_, self.std_
+        else:
+            use_baseline = ~(std > 0)
+            mean = np.where(use_baseline, self.mean_, mean)
+            std = np.where(use_baseline, self.std_, std)
+        z = (x[0] - mean) / std
+        mse = float(self._reconstruction_error(self.scaler.transform(x))[0])
+        flags = {
+            "z_score": int((np.abs(z) > self.z_threshold).any()),
+            "isolation_forest": int(self.forest.predict(x)[0] == -1),
+            "autoencoder": int(mse > self.ae_threshold)
+        }
+        vote = sum(self.weights.get(name, 0.0) * flag for name, flag in flags.items())
+        return {"z_scores": z, "flags": flags, "reconstruction_error": mse, "vote": vote,
+                "anomaly": vote >= self.vote_threshold}
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        autoencoder = self.autoencoder
+        self.autoencoder = None
+        try:
+            joblib.dump(self, os.path.join(directory, "detector.joblib"))
+        finally:
+            self.autoencoder = autoencoder
+        save_autoencoder(autoencoder, directory, self.ae_backend)
 
-def detect_anomalies_near_issue(df, issue_time, window_minutes=15):
-    start = pd.to_datetime(issue_time) - pd.Timedelta(minutes=window_minutes)
-    end = pd.to_datetime(issue_time) + pd.Timedelta(minutes=window_minutes)
-    window_df = df[(df.index >= start) & (df.index <= end)]
+    @classmethod
+    def load(cls, directory):
+        detector = joblib.load(os.path.join(directory, "detector.joblib"))
+        detector.autoencoder = load_autoencoder(directory, detector.ae_backend)
+        return detector
+
+
+registry = AnomalyModelRegistry(MachineAnomalyDetector)
+
+def get_detector(machine_id, df=None):
+    """
+    Return the machine's latest registered detector, fitting one on df (its full
+    history) and registering it if there is none yet
+    """
+    return registry.get_or_fit(machine_id, lambda: df)
+
+
+# Ensemble and Analysis
+def detect_anomalies_near_issue(df, issue_time, window_minutes=15, detector=None, machine_id="MILL-001"):
+    """
+    Score the readings within window_minutes of issue_time with a fitted detector and
+    return the anomalous ones. Without a detector, machine_id's registered one is
+    used, fitted on df and registered only the first time.
+    """
+    issue_time = pd.to_datetime(issue_time)
+    start = issue_time - pd.Timedelta(minutes=window_minutes)
+    end = issue_time + pd.Timedelta(minutes=window_minutes)
+    # df is sorted by timestamp, so the window is a binary-search slice
+    lo = df.index.searchsorted(start, side="left")
+    hi = df.index.searchsorted(end, side="right")
+    window_df = df.iloc[lo:hi]
     
     if window_df.empty:
         print("No sensor data found near the issue time.")
         return pd.DataFrame()
-        
-    anomaly_flags = ensemble_anomaly_detection(window_df)
-    window_df['anomaly'] = anomaly_flags
-    return window_df[window_df['anomaly'] == 1]
+
+    detector = detector or get_detector(machine_id, df)
+    history = df.iloc[max(lo - detector.rolling_window, 0):lo]
+    scored = detector.score(window_df, history)
+    return scored[scored['anomaly'] == 1]
+
+
+def detect_anomalies_for_machine(store, machine_id, issue_time, window_minutes=15, detector=None, parallel=True):
+    """
+    Like detect_anomalies_near_issue, but reads only the window (and the readings
+    seeding the rolling z-score) from a SensorStore instead of the full history.
+    parallel=False scores the members in the calling thread.
+    """
+    issue_time = pd.to_datetime(issue_time, utc=True)
+    start = issue_time - pd.Timedelta(minutes=window_minutes)
+    end = issue_time + pd.Timedelta(minutes=window_minutes)
+    window_df = store.query(machine_id, start, end)
+    if window_df.empty:
+        print(f"No sensor data found for {machine_id} near the issue time.")
+        return pd.DataFrame()
+
+    detector = detector or registry.get_or_fit(machine_id, lambda: store.load_machine(machine_id))
+    history = store.tail_before(machine_id, start, detector.rolling_window, columns=detector.columns)
+    scored = detector.score(window_df.reindex(columns=detector.columns), history, parallel=parallel)
+    return scored[scored['anomaly'] == 1]
+
+
+def _sweep_machine(store_root, model_dir, machine_id, issue_times, window_minutes, weights, vote_threshold):
+    # Runs in a worker process: load the machine's model once, then score all its incidents.
+    # Members run serially here; the process pool already keeps every core busy.
+    store = SensorStore(store_root)
+    machine_registry = AnomalyModelRegistry(MachineAnomalyDetector, model_dir)
+    detector = machine_registry.get_or_fit(machine_id, lambda: store.load_machine(machine_id))
+    if weights is not None:
+        detector.weights = weights
+    if vote_threshold is not None:
+        detector.vote_threshold = vote_threshold
+    return [
+        (machine_id, issue_time, detect_anomalies_for_machine(store, machine_id, issue_time, window_minutes, detector, parallel=False))
+        for issue_time in issue_times
+    ]
+
+
+def sweep_incidents(store, incidents, window_minutes=15, weights=None, vote_threshold=None, max_workers=None):
+    """
+    Score many (machine_id, issue_time) incidents across the fleet, one machine per task
+    on a process pool (all cores by default). Returns {(machine_id, issue_time): anomalies}.
+    """
+    by_machine = defaultdict(list)
+    for machine_id, issue_time in incidents:
+        by_machine[machine_id].append(issue_time)
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        futures = [
+            pool.submit(_sweep_machine, store.root, registry.root, machine_id, issue_times,
+                        window_minutes, weights, vote_threshold)
+            for machine_id, issue_times in by_machine.items()
+        ]
+        for future in as_completed(futures):
+            for machine_id, issue_time, anomalies in future.result():
+                results[(machine_id, issue_time)] = anomalies
+    return results
 
 
 def generate_ai_report(anomalies, issue_time, issue_desc, api_key):
@@ -117,14 +336,14 @@ def main():
     issue_desc = "Unexpected machine halt during operation."
     openai_api_key = os.environ.get("OPENAI_API_KEY")
     
-    # Load data
-    with open("Data/Machine_Sensor_Data.json") as f:
-        json_data = json.load(f)
+    machine_id = "MILL-001"
     
-    df = load_machine_data(json_data)
+    # Load data into the columnar store (re-ingesting the same readings is a no-op merge)
+    store = SensorStore()
+    store.ingest_json("Data/Machine_Sensor_Data.json")
     
-    # Detect anomalies
-    anomalies = detect_anomalies_near_issue(df, issue_time)
+    # Detect anomalies with the machine's detector, fitted once and reused afterwards
+    anomalies = detect_anomalies_for_machine(store, machine_id, issue_time)
     
     # Print results
     print(f"Anomalies detected near {issue_time} for issue: {issue_desc}")
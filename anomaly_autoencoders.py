@@ -0,0 +1,140 @@
+import os
+import numpy as np
+
+AUTOENCODER_BACKEND = os.environ.get("ANOMALY_AE_BACKEND", "numpy")
+HIDDEN_UNITS = (8, 3, 8)
+
+
+class NumpyAutoencoder:
+    """
+    Dense autoencoder (input -> 8 -> 3 -> 8 -> input, ReLU hidden layers, linear output)
+    trained with Adam on mean squared error, in plain NumPy. Same architecture and
+    fit/predict interface as the Keras model, without importing TensorFlow.
+    """
+    def __init__(self, input_dim, hidden_units=HIDDEN_UNITS, learning_rate=0.001, seed=42):
+        self.learning_rate = learning_rate
+        rng = np.random.default_rng(seed)
+        sizes = [input_dim, *hidden_units, input_dim]
+        # Glorot-uniform weights and zero biases, as Keras Dense layers default to
+        self.weights = []
+        self.biases = []
+        for fan_in, fan_out in zip(sizes[:-1], sizes[1:]):
+            limit = np.sqrt(6.0 / (fan_in + fan_out))
+            self.weights.append(rng.uniform(-limit, limit, size=(fan_in, fan_out)))
+            self.biases.append(np.zeros(fan_out))
+        self._rng = rng
+        self._step = 0
+        self._moments = [(np.zeros_like(p), np.zeros_like(p)) for p in self.weights + self.biases]
+
+    def _forward(self, X):
+        activations = [X]
+        for i, (W, b) in enumerate(zip(self.weights, self.biases)):
+            out = activations[-1] @ W + b
+            activations.append(out if i == len(self.weights) - 1 else np.maximum(out, 0.0))
+        return activations
+
+    def fit(self, X, Y=None, epochs=30, batch_size=8, verbose=0):
+        X = np.asarray(X, dtype=float)
+        Y = X if Y is None else np.asarray(Y, dtype=float)
+        for _ in range(epochs):
+            order = self._rng.permutation(len(X))
+            for start in range(0, len(X), batch_size):
+                idx = order[start:start + batch_size]
+                self._train_step(X[idx], Y[idx])
+        return self
+
+    def _train_step(self, X, Y):
+        activations = self._forward(X)
+        # d(mean squared error)/d(output), averaged over batch and features like Keras "mse"
+        delta = 2.0 * (activations[-1] - Y) / Y.size
+        grads_w, grads_b = [], []
+        for i in reversed(range(len(self.weights))):
+            grads_w.insert(0, activations[i].T @ delta)
+            grads_b.insert(0, delta.sum(axis=0))
+            if i:
+                delta = (delta @ self.weights[i].T) * (activations[i] > 0)
+        self._adam(self.weights + self.biases, grads_w + grads_b)
+
+    def _adam(self, params, grads, beta1=0.9, beta2=0.999, eps=1e-7):
+        self._step += 1
+        correction1 = 1 - beta1 ** self._step
+        correction2 = 1 - beta2 ** self._step
+        for param, grad, (m, v) in zip(params, grads, self._moments):
+            m *= beta1
+            m += (1 - beta1) * grad
+            v *= beta2
+            v += (1 - beta2) * grad * grad
+            param -= self.learning_rate * (m / correction1) / (np.sqrt(v / correction2) + eps)
+
+    def predict(self, X, verbose=0):
+        return self._forward(np.asarray(X, dtype=float))[-1]
+
+    def save(self, path):
+        np.savez(path, *self.weights, *self.biases)
+
+    @classmethod
+    def load(cls, path):
+        arrays = np.load(path)
+        params = [arrays[f"arr_{i}"] for i in range(len(arrays.files))]
+        layers = len(params) // 2
+        model = cls(params[0].shape[0], tuple(W.shape[1] for W in params[:layers - 1]))
+        model.weights = params[:layers]
+        model.biases = params[layers:]
+        return model
+
+
+class KerasAutoencoder:
+    """
+    The original TensorFlow/Keras autoencoder. TensorFlow is imported only when this
+    backend is constructed or loaded.
+    """
+    def __init__(self, input_dim, hidden_units=HIDDEN_UNITS, learning_rate=0.001, model=None):
+        from tensorflow.keras.models import Model
+        from tensorflow.keras.layers import Input, Dense
+        from tensorflow.keras.optimizers import Adam
+        if model is None:
+            input_layer = Input(shape=(input_dim,))
+            x = input_layer
+            for units in hidden_units:
+                x = Dense(units, activation="relu")(x)
+            output = Dense(input_dim, activation="linear")(x)
+            model = Model(inputs=input_layer, outputs=output)
+            model.compile(optimizer=Adam(learning_rate), loss="mse")
+        self.model = model
+
+    def fit(self, X, Y=None, epochs=30, batch_size=8, verbose=0):
+        self.model.fit(X, X if Y is None else Y, epochs=epochs, batch_size=batch_size, verbose=verbose)
+        return self
+
+    def predict(self, X, verbose=0):
+        return self.model.predict(X, verbose=verbose)
+
+    def save(self, path):
+        self.model.save(path)
+
+    @classmethod
+    def load(cls, path):
+        from tensorflow.keras.models import load_model
+        return cls(None, model=load_model(path))
+
+
+AUTOENCODER_BACKENDS = {
+    "numpy": (NumpyAutoencoder, "autoencoder.npz"),
+    "tensorflow": (KerasAutoencoder, "autoencoder.keras")
+}
+
+
+def make_autoencoder(input_dim, backend=None):
+    backend = backend or AUTOENCODER_BACKEND
+    if backend not in AUTOENCODER_BACKENDS:
+        raise ValueError(f"Unknown autoencoder backend '{backend}'. Available: {', '.join(AUTOENCODER_BACKENDS)}")
+    return AUTOENCODER_BACKENDS[backend][0](input_dim)
+
+
+def save_autoencoder(model, directory, backend):
+    model.save(os.path.join(directory, AUTOENCODER_BACKENDS[backend][1]))
+
+
+def load_autoencoder(directory, backend):
+    model_class, filename = AUTOENCODER_BACKENDS[backend]
+    return model_class.load(os.path.join(directory, filename))
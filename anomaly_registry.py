@@ -0,0 +1,114 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+MODEL_DIR = os.environ.get("ANOMALY_MODEL_DIR", "models/anomaly")
+
+
+class AnomalyModelRegistry:
+    """
+    Versioned on-disk registry of fitted per-machine detectors:
+
+        <root>/<machine_id>/v<N>/...        files written by detector.save()
+        <root>/<machine_id>/v<N>/meta.json  version, creation time, fit metadata
+        <root>/<machine_id>/LATEST          the version served by default
+
+    Loaded detectors are cached in memory, so each process reads a model from disk once.
+    `detector_class` must provide save(directory) and a load(directory) classmethod.
+    """
+    def __init__(self, detector_class, root=MODEL_DIR, keep_versions=5):
+        self.detector_class = detector_class
+        self.root = root
+        self.keep_versions = keep_versions
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _machine_dir(self, machine_id):
+        return os.path.join(self.root, machine_id)
+
+    def versions(self, machine_id):
+        directory = self._machine_dir(machine_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(name[1:]) for name in os.listdir(directory) if re.fullmatch(r"v\d+", name))
+
+    def latest_version(self, machine_id):
+        path = os.path.join(self._machine_dir(machine_id), "LATEST")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return int(f.read().strip())
+
+    def metadata(self, machine_id, version=None):
+        version = version or self.latest_version(machine_id)
+        if version is None:
+            return None
+        with open(os.path.join(self._machine_dir(machine_id), f"v{version}", "meta.json")) as f:
+            return json.load(f)
+
+    def save(self, machine_id, detector, metadata=None):
+        """
+        Store a fitted detector as the machine's next version and make it the latest
+        """
+        with self._lock:
+            version = max(self.versions(machine_id), default=0) + 1
+            directory = os.path.join(self._machine_dir(machine_id), f"v{version}")
+            tmp_dir = f"{directory}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            detector.save(tmp_dir)
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump({"machine_id": machine_id, "version": version, "created_at": time.time(), **(metadata or {})}, f)
+            os.replace(tmp_dir, directory)
+
+            latest_tmp = os.path.join(self._machine_dir(machine_id), "LATEST.tmp")
+            with open(latest_tmp, "w") as f:
+                f.write(str(version))
+            os.replace(latest_tmp, os.path.join(self._machine_dir(machine_id), "LATEST"))
+
+            self._cache[(machine_id, version)] = detector
+            self._prune(machine_id)
+        return version
+
+    def load(self, machine_id, version=None):
+        """
+        The machine's detector at `version` (latest by default), or None if none was saved
+        """
+        version = version or self.latest_version(machine_id)
+        if version is None:
+            return None
+        key = (machine_id, version)
+        with self._lock:
+            if key not in self._cache:
+                directory = os.path.join(self._machine_dir(machine_id), f"v{version}")
+                self._cache[key] = self.detector_class.load(directory)
+            return self._cache[key]
+
+    def get_or_fit(self, machine_id, load_history, **detector_params):
+        """
+        Latest detector of a machine, fitting and saving one on the history returned by
+        load_history() if the machine has none yet
+        """
+        detector = self.load(machine_id)
+        if detector is not None:
+            return detector
+        df = load_history()
+        if df is None or df.empty:
+            raise ValueError(f"No fitted detector for {machine_id} and no data to fit one")
+        detector = self.detector_class(**detector_params).fit(df)
+        self.save(machine_id, detector, {
+            "samples": len(df),
+            "columns": list(df.columns),
+            "trained_from": str(df.index.min()),
+            "trained_to": str(df.index.max())
+        })
+        return detector
+
+    def _prune(self, machine_id):
+        latest = self.latest_version(machine_id)
+        for version in self.versions(machine_id)[:-self.keep_versions]:
+            if version != latest:
+                shutil.rmtree(os.path.join(self._machine_dir(machine_id), f"v{version}"), ignore_errors=True)
+                self._cache.pop((machine_id, version), None)
@@ -0,0 +1,284 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import socketserver
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+from Anamoly_detection import registry
+from sensor_store import SensorStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ANOMALY_EVENTS_DB = os.environ.get("ANOMALY_EVENTS_DB", "Data/anomaly_events.sqlite3")
+
+
+class RollingStats:
+    """
+    Mean and std of the last `window` readings, kept in a ring buffer with running
+    sums so every update and lookup is O(1) in the number of readings
+    """
+    def __init__(self, window, n_features):
+        self.window = window
+        self.buffer = np.zeros((window, n_features))
+        self.sum = np.zeros(n_features)
+        self.sum_sq = np.zeros(n_features)
+        self.count = 0
+        self.next = 0
+
+    def push(self, x):
+        if self.count == self.window:
+            old = self.buffer[self.next]
+            self.sum -= old
+            self.sum_sq -= old * old
+        else:
+            self.count += 1
+        self.buffer[self.next] = x
+        self.sum += x
+        self.sum_sq += x * x
+        self.next = (self.next + 1) % self.window
+
+    def mean_std(self):
+        if self.count < 2:
+            return None, None
+        mean = self.sum / self.count
+        var = (self.sum_sq - self.count * mean * mean) / (self.count - 1)
+        return mean, np.sqrt(np.clip(var, 0, None))
+
+
+class AnomalyEventStore:
+    """
+    SQLite log of detected anomaly events, queried by machine and time so anomaly
+    context is ready when a ticket arrives instead of being rebuilt from raw history
+    """
+    def __init__(self, path=ANOMALY_EVENTS_DB):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS anomaly_events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, machine_id TEXT NOT NULL, timestamp TEXT NOT NULL, "
+            "vote REAL NOT NULL, flags TEXT NOT NULL, z_scores TEXT NOT NULL, sensors TEXT NOT NULL, "
+            "top_sensors TEXT NOT NULL, detected_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_anomaly_events_machine_time ON anomaly_events (machine_id, timestamp)")
+        self._conn.commit()
+
+    def add(self, event):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO anomaly_events (machine_id, timestamp, vote, flags, z_scores, sensors, top_sensors, detected_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (event["machine_id"], event["timestamp"], event["vote"], json.dumps(event["flags"]),
+                 json.dumps(event["z_scores"]), json.dumps(event["sensors"]), json.dumps(event["top_sensors"]),
+                 event["detected_at"])
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class StreamingAnomalyDetector:
+    """
+    Scores readings one at a time as they arrive. Each machine keeps rolling
+    statistics over its last `rolling_window` readings; every reading is compared
+    with them and scored by the machine's registered forest and autoencoder, all in
+    constant time per reading. Machines without a registered detector are skipped
+    until one is fitted. Detectors are held in memory and the registry is checked
+    for a newer version every `reload_interval` seconds.
+    """
+    def __init__(self, event_store=None, on_event=None, archive=None, archive_every=1000, reload_interval=30.0):
+        self.event_store = event_store
+        self.on_event = on_event
+        self.archive = archive
+        self.archive_every = archive_every
+        self.reload_interval = reload_interval
+        # machine_id -> {"version", "detector", "stats", "checked_at"}
+        self._machines = {}
+        self._pending = []
+
+    def _machine(self, machine_id):
+        """
+        The machine's cached detector state, reloaded when the registry has a newer
+        version. Rolling statistics are kept across versions with the same sensors
+        and window, and rebuilt otherwise.
+        """
+        state = self._machines.get(machine_id)
+        now = time.monotonic()
+        if state is not None and now - state["checked_at"] < self.reload_interval:
+            return state
+        version = registry.latest_version(machine_id)
+        if state is not None and state["version"] == version:
+            state["checked_at"] = now
+            return state
+
+        if version is None:
+            logger.warning(f"No registered detector for {machine_id}; its readings are not scored")
+            state = {"version": None, "detector": None, "stats": None, "checked_at": now}
+        else:
+            detector = registry.load(machine_id, version)
+            stats = state["stats"] if state is not None else None
+            previous = state["detector"] if state is not None else None
+            if (stats is None or previous is None or previous.columns != detector.columns
+                    or previous.rolling_window != detector.rolling_window):
+                stats = RollingStats(detector.rolling_window, len(detector.columns))
+            if state is not None:
+                logger.info(f"Scoring {machine_id} with detector v{version}")
+            state = {"version": version, "detector": detector, "stats": stats, "checked_at": now}
+        self._machines[machine_id] = state
+        return state
+
+    def process(self, reading):
+        """
+        Score one {"machine_id", "timestamp", "sensors"} reading; returns the anomaly event or None
+        """
+        machine_id = reading["machine_id"]
+        if self.archive is not None:
+            self._pending.append(reading)
+            if len(self._pending) >= self.archive_every:
+                self.flush()
+
+        state = self._machine(machine_id)
+        detector, stats = state["detector"], state["stats"]
+        if detector is None:
+            return None
+
+        x = np.array([reading["sensors"].get(column, np.nan) for column in detector.columns], dtype=float)
+        mean, std = stats.mean_std() if stats.count >= detector.min_periods else (None, None)
+        result = detector.score_reading(x, mean, std)
+        stats.push(detector._fill_missing(x[None, :])[0])
+
+        if not result["anomaly"]:
+            return None
+        z_scores = dict(zip(detector.columns, np.round(result["z_scores"], 3).tolist()))
+        event = {
+            "machine_id": machine_id,
+            "timestamp": pd.to_datetime(reading["timestamp"], utc=True).isoformat(),
+            "vote": result["vote"],
+            "flags": result["flags"],
+            "z_scores": z_scores,
+            "sensors": reading["sensors"],
+            "top_sensors": sorted(z_scores, key=lambda column: abs(z_scores[column]), reverse=True)[:3],
+            "detected_at": time.time()
+        }
+        if self.event_store is not None:
+            self.event_store.add(event)
+        if self.on_event is not None:
+            self.on_event(event)
+        return event
+
+    def flush(self):
+        """Write buffered readings to the sensor store"""
+        if self.archive is not None and self._pending:
+            self.archive.ingest_readings(self._pending)
+            self._pending = []
+
+
+def tail_file(path, from_start=False, poll_interval=0.5, stop=None):
+    """Yield lines appended to a file, like `tail -f`"""
+    while not os.path.exists(path):
+        time.sleep(poll_interval)
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        partial = ""
+        while stop is None or not stop.is_set():
+            line = f.readline()
+            if not line:
+                time.sleep(poll_interval)
+                continue
+            partial += line
+            if partial.endswith("\n"):
+                yield partial
+                partial = ""
+
+
+def serve_socket(host, port, lines):
+    """
+    Accept TCP connections and put every received line on the `lines` queue.
+    Returns the running server; call shutdown() to stop it.
+    """
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                lines.put(raw.decode("utf-8"))
+
+    server = socketserver.ThreadingTCPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="anomaly-stream-socket", daemon=True).start()
+    return server
+
+
+def parse_reading(line):
+    """Decode one JSON line into a reading, raising ValueError if it is not one"""
+    reading = json.loads(line)
+    if not isinstance(reading, dict):
+        raise ValueError("expected a JSON object")
+    if not isinstance(reading.get("machine_id"), str) or not isinstance(reading.get("sensors"), dict):
+        raise ValueError("expected a string machine_id and a sensors object")
+    if "timestamp" not in reading:
+        raise ValueError("missing timestamp")
+    return reading
+
+
+def run(lines, detector):
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            detector.process(parse_reading(line))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            # One bad line from any client must not stop the service
+            logger.warning(f"Skipping malformed reading: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score sensor readings as they stream in and record anomaly events")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="JSON Lines file to follow")
+    source.add_argument("--port", type=int, help="TCP port accepting JSON Lines readings")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--from-start", action="store_true", help="Process the file's existing lines before following it")
+    parser.add_argument("--events-db", default=ANOMALY_EVENTS_DB)
+    parser.add_argument("--archive", action="store_true", help="Also append readings to the sensor store")
+    args = parser.parse_args()
+
+    event_store = AnomalyEventStore(args.events_db)
+    detector = StreamingAnomalyDetector(
+        event_store=event_store,
+        on_event=lambda event: logger.info(
+            f"Anomaly on {event['machine_id']} at {event['timestamp']}: vote {event['vote']}, "
+            f"top sensors {', '.join(event['top_sensors'])}"
+        ),
+        archive=SensorStore() if args.archive else None
+    )
+    server = None
+    try:
+        if args.file:
+            run(tail_file(args.file, from_start=args.from_start), detector)
+        else:
+            lines = queue.Queue()
+            server = serve_socket(args.host, args.port, lines)
+            logger.info(f"Listening for readings on {args.host}:{args.port}")
+            run(iter(lines.get, None), detector)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.shutdown()
+        detector.flush()
+        event_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -25,19 +25,17 @@ if "messages" not in st.session_state:
 if "context" not in st.session_state:
     st.session_state.context = {}
 
-# Connect to Milvus
+# Connect to Milvus once per Streamlit process and reuse the collection across reruns
+# (failures raise and are not cached, so the next call retries)
+@st.cache_resource
 def connect_to_milvus():
-    try:
-        connections.connect(
-            host=os.getenv("MILVUS_HOST"),
-            port=os.getenv("MILVUS_PORT"),
-            user=os.getenv("MILVUS_USER"),
-            password=os.getenv("MILVUS_PASSWORD")
-        )
-        return Collection("tickets")
-    except Exception as e:
-        st.error(f"Failed to connect to Milvus: {e}")
-        return None
+    connections.connect(
+        host=os.getenv("MILVUS_HOST"),
+        port=os.getenv("MILVUS_PORT"),
+        user=os.getenv("MILVUS_USER"),
+        password=os.getenv("MILVUS_PASSWORD")
+    )
+    return Collection("tickets")
 
 # Define the function schema for OpenAI function calling
 function_schema = [
@@ -56,8 +54,10 @@ function_schema = [
 ]
 
 def search_tickets(issue_description, serial_number=None):
-    collection = connect_to_milvus()
-    if not collection:
+    try:
+        collection = connect_to_milvus()
+    except Exception as e:
+        st.error(f"Failed to connect to Milvus: {e}")
         return "Database connection error."
     query = issue_description
     if serial_number:
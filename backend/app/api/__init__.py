@@ -1,3 +1,3 @@
-from app.api.v1 import diagnose, kb, feedback
+from app.api.v1 import diagnose, kb, feedback, health
 
-__all__ = ["diagnose", "kb", "feedback"] 
\ No newline at end of file
+__all__ = ["diagnose", "kb", "feedback", "health"] 
\ No newline at end of file
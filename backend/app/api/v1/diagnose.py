@@ -1,18 +1,75 @@
-from fastapi import APIRouter, HTTPException
-from app.database.models import IssueDescription
-from app.core.rag import RAGEngine
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from app.database.models import IssueDescription, BatchIssueDescription
+from app.core.rag import AsyncRAGEngine
+from app.config import get_settings
+from app.dependencies import get_rag_engine
+from typing import Dict, Any, AsyncIterator
+import json
+
+settings = get_settings()
 
 router = APIRouter()
-rag_engine = RAGEngine()
 
 @router.post("/diagnose")
-async def diagnose_issue(issue: IssueDescription) -> Dict[str, Any]:
+async def diagnose_issue(issue: IssueDescription, rag_engine: AsyncRAGEngine = Depends(get_rag_engine)) -> Dict[str, Any]:
     """
-    Endpoint to diagnose a new issue
+    Endpoint to diagnose a new issue. Pass machine_id (and the issue's timestamp, now by
+    default) to ground the diagnosis on that machine's recorded sensor anomalies.
     """
     try:
-        response = rag_engine.process_issue(issue.ticket_text)
+        response = await rag_engine.process_issue(issue.ticket_text, issue.machine_id, issue.timestamp)
         return response
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/diagnose/stream")
+async def diagnose_issue_stream(issue: IssueDescription, rag_engine: AsyncRAGEngine = Depends(get_rag_engine)) -> StreamingResponse:
+    """
+    Diagnose a new issue as a server-sent event stream: an "anomalies" event with the
+    machine's recorded sensor anomalies (when there are any), a "tickets" event with the
+    similar past tickets, then the diagnosis text while the model writes it (a "field"
+    event naming the field, "summary" or "suggested_fix", followed by "token" events
+    carrying its plain text), then a "result" event with the parsed diagnosis (or an
+    "error" event)
+    """
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event, data in rag_engine.stream_issue(issue.ticket_text, issue.machine_id, issue.timestamp):
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/diagnose/batch")
+async def diagnose_issues_batch(batch: BatchIssueDescription, rag_engine: AsyncRAGEngine = Depends(get_rag_engine)) -> StreamingResponse:
+    """
+    Diagnose many issues in one call. Results are streamed back as newline-delimited
+    JSON in completion order, one {"index", "result"} or {"index", "error"} object per issue.
+    """
+    if len(batch.issues) > settings.BATCH_DIAGNOSE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(batch.issues)} issues exceeds the limit of {settings.BATCH_DIAGNOSE_MAX_ITEMS}"
+        )
+
+    async def lines() -> AsyncIterator[str]:
+        try:
+            async for index, response, error in rag_engine.process_issues(
+                [issue.ticket_text for issue in batch.issues],
+                machines=[(issue.machine_id, issue.timestamp) for issue in batch.issues]
+            ):
+                item = {"index": index, "error": error} if error else {"index": index, "result": response}
+                yield json.dumps(item, default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from app.dependencies import ServiceContainer, get_services
+from typing import Dict, Any
+
+router = APIRouter()
+
+@router.get("/health")
+async def health() -> Dict[str, Any]:
+    """
+    Liveness probe: the API process is up
+    """
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def ready(services: ServiceContainer = Depends(get_services)) -> JSONResponse:
+    """
+    Readiness probe: Milvus is connected and all collections are loaded
+    """
+    try:
+        # The first call builds the client, retrying the connection with sleeps; keep that off the event loop
+        milvus_client = await run_in_threadpool(lambda: services.async_milvus_client)
+        status = await milvus_client.health()
+    except Exception as e:
+        # Client construction itself fails while Milvus is unreachable
+        status = {"connected": False, "ready": False, "collections": {}, "error": str(e)}
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
@@ -1,68 +1,145 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from app.database.milvus import MilvusClient
-from app.core.embeddings import EmbeddingGenerator
-from typing import Dict, Any, List
-import json
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Depends
+from starlette.concurrency import run_in_threadpool
+from app.database.milvus import AsyncMilvusClient
+from app.core.embeddings import AsyncEmbeddingGenerator
+from app.core.ingestion import is_json_lines
+from app.core.jobs import IngestionWorkerPool, JOB_STATUSES
+from app.config import get_settings
+from app.dependencies import get_async_milvus_client, get_async_embedding_generator, get_ingestion_workers
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+import os
+import shutil
 import uuid
 
 router = APIRouter()
-milvus_client = MilvusClient()
-embedding_generator = EmbeddingGenerator()
 
-@router.post("/kb/upload")
-async def upload_knowledge(file: UploadFile = File(...)) -> Dict[str, Any]:
+settings = get_settings()
+
+@router.post("/kb/upload", status_code=202)
+async def upload_knowledge(
+    file: UploadFile = File(...),
+    workers: IngestionWorkerPool = Depends(get_ingestion_workers)
+) -> Dict[str, Any]:
     """
-    Upload new knowledge base documents
+    Queue new knowledge base documents for background ingestion and return the job
     """
     try:
-        content = await file.read()
-        data = json.loads(content)
-        
-        # Process tickets
-        if "tickets" in data:
-            for ticket in data["tickets"]:
-                ticket_id = str(uuid.uuid4())
-                embedding = embedding_generator.generate_embedding(ticket["issueDescription"])
-                ticket["id"] = ticket_id
-                milvus_client.insert_ticket(ticket, embedding)
-        
-        # Process team knowledge
-        if "team_members" in data:
-            for member in data["team_members"]:
-                member_id = str(uuid.uuid4())
-                # Create a text representation for embedding
-                text_repr = f"{member['name']} - {member['role']}\nSkills: {', '.join(member['skills'])}\nCertifications: {', '.join(member['certifications'])}\nResolved Issues: {', '.join(member['resolved_issues'])}"
-                embedding = embedding_generator.generate_embedding(text_repr)
-                member_data = {
-                    "id": member_id,
-                    **member
-                }
-                milvus_client.insert_team_member(member_data, embedding)
-        
-        return {"message": "Knowledge base updated successfully"}
+        job_id = uuid.uuid4().hex
+        json_lines = is_json_lines(file.filename or "")
+        path = os.path.join(settings.INGEST_UPLOAD_DIR, f"{job_id}{'.jsonl' if json_lines else '.json'}")
+        await run_in_threadpool(_save_upload, file, path)
+        job = workers.store.create(path, file.filename, json_lines, job_id=job_id)
+        workers.notify()
+        return {"message": "Upload queued for ingestion", "job": job}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _save_upload(file: UploadFile, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(file.file, out, 1024 * 1024)
+
+@router.get("/kb/jobs")
+async def list_ingestion_jobs(
+    status: Optional[str] = Query(None, enum=JOB_STATUSES),
+    limit: int = Query(50, ge=1, le=500),
+    workers: IngestionWorkerPool = Depends(get_ingestion_workers)
+) -> Dict[str, Any]:
+    """
+    List recent ingestion jobs, newest first; filter by status="failed" to see failures
+    """
+    return {"jobs": workers.store.list_jobs(status=status, limit=limit)}
+
+@router.get("/kb/jobs/{job_id}")
+async def get_ingestion_job(
+    job_id: str,
+    workers: IngestionWorkerPool = Depends(get_ingestion_workers)
+) -> Dict[str, Any]:
+    """
+    Progress, throughput, per-kind counts and any error of one ingestion job
+    """
+    job = workers.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+    return job
+
+@router.post("/kb/jobs/{job_id}/cancel")
+async def cancel_ingestion_job(
+    job_id: str,
+    workers: IngestionWorkerPool = Depends(get_ingestion_workers)
+) -> Dict[str, Any]:
+    """
+    Cancel a queued job, or stop a running one after its current batch (records
+    already inserted are kept)
+    """
+    job = workers.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+    if job["status"] in ("completed", "failed"):
+        raise HTTPException(status_code=409, detail=f"Ingestion job {job_id} already {job['status']}")
+    return job
+
 @router.get("/kb/search")
-async def search_knowledge(query: str) -> Dict[str, Any]:
+async def search_knowledge(
+    query: str,
+    limit: int = Query(5, ge=1, le=100),
+    machine_model: Optional[List[str]] = Query(None),
+    serial_number: Optional[str] = None,
+    priority: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    reported_after: Optional[datetime] = None,
+    reported_before: Optional[datetime] = None,
+    async_milvus_client: AsyncMilvusClient = Depends(get_async_milvus_client),
+    async_embedding_generator: AsyncEmbeddingGenerator = Depends(get_async_embedding_generator)
+) -> Dict[str, Any]:
     """
-    Search the knowledge base
+    Search the knowledge base, optionally filtered by ticket metadata
     """
     try:
-        embedding = embedding_generator.generate_embedding(query)
-        results = milvus_client.search_similar_tickets(embedding)
+        embedding = await async_embedding_generator.generate_embedding(query)
+        results = await async_milvus_client.search_similar_tickets(
+            embedding,
+            limit,
+            machine_model=machine_model,
+            serial_number=serial_number,
+            priority=priority,
+            status=status,
+            reported_after=reported_after,
+            reported_before=reported_before
+        )
         return {"results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/kb/search/team")
-async def search_team_knowledge(query: str) -> Dict[str, Any]:
+async def search_team_knowledge(
+    query: str,
+    async_milvus_client: AsyncMilvusClient = Depends(get_async_milvus_client),
+    async_embedding_generator: AsyncEmbeddingGenerator = Depends(get_async_embedding_generator)
+) -> Dict[str, Any]:
     """
     Search the team knowledge base
     """
     try:
-        embedding = embedding_generator.generate_embedding(query)
-        results = milvus_client.search_similar_team_members(embedding)
+        embedding = await async_embedding_generator.generate_embedding(query)
+        results = await async_milvus_client.search_similar_team_members(embedding)
         return {"results": results}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/kb/tickets/{ticket_id}")
+async def delete_ticket(
+    ticket_id: str,
+    async_milvus_client: AsyncMilvusClient = Depends(get_async_milvus_client)
+) -> Dict[str, Any]:
+    """
+    Remove a ticket (every stored copy of it) from the knowledge base
+    """
+    try:
+        deleted = await async_milvus_client.delete_tickets([ticket_id])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
+    return {"message": "Ticket deleted", "ticket_id": ticket_id, "deleted": deleted}
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional, Dict, Any
 
 class Settings(BaseSettings):
     # API Configuration
@@ -15,10 +16,73 @@ class Settings(BaseSettings):
     MILVUS_PORT: int
     MILVUS_USER: str
     MILVUS_PASSWORD: str
+    MILVUS_INSERT_BATCH_SIZE: int = 1000
+    MILVUS_EXECUTOR_WORKERS: int = 8
+    MILVUS_MAX_INFLIGHT_SEARCHES: int = 16
+    MILVUS_CONNECT_RETRIES: int = 5
+    MILVUS_RECONNECT_BACKOFF_SECONDS: float = 0.5
+    
+    # Vector Index Configuration (see app/database/indexes.py for profiles)
+    MILVUS_INDEX_PROFILE: str = "ivf_flat"
+    MILVUS_METRIC_TYPE: str = "L2"
+    MILVUS_INDEX_TYPE: Optional[str] = None
+    MILVUS_INDEX_PARAMS: Optional[Dict[str, Any]] = None
+    MILVUS_SEARCH_PARAMS: Optional[Dict[str, Any]] = None
     
     # OpenAI Configuration
     OPENAI_API_KEY: str
+    LLM_MODEL: str = "gpt-4"
+    LLM_MAX_RETRIES: int = 2
+    
+    # Batch Diagnose Configuration
+    BATCH_DIAGNOSE_MAX_ITEMS: int = 500
+    BATCH_LLM_CONCURRENCY: int = 8
+    
+    # Embedding Configuration
+    EMBEDDING_MODEL: str = "text-embedding-ada-002"
+    EMBEDDING_BATCH_SIZE: int = 256
+    EMBEDDING_MAX_BATCH_TOKENS: int = 100000
+    EMBEDDING_CONCURRENCY: int = 4
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_MEMORY_ITEMS: int = 10000
+    EMBEDDING_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Bulk Ingestion Configuration
+    INGEST_BATCH_SIZE: int = 500
+    INGEST_CHECKPOINT_DIR: str = "cache/checkpoints"
+    INGEST_JOBS_DB_PATH: str = "cache/ingestion_jobs.sqlite3"
+    INGEST_UPLOAD_DIR: str = "cache/uploads"
+    INGEST_WORKERS: int = 1
+    # Embedding requests in flight per ingestion job; kept low so uploads leave headroom for /diagnose
+    INGEST_EMBEDDING_CONCURRENCY: int = 1
+    # Running jobs send a heartbeat this often; ones silent for INGEST_JOB_STALE_SECONDS are requeued
+    INGEST_JOB_HEARTBEAT_SECONDS: float = 10.0
+    INGEST_JOB_STALE_SECONDS: float = 60.0
     
+    # Retrieval Configuration
+    RAG_TOP_K: int = 5
+    RAG_CANDIDATE_K: int = 10
+    HYBRID_SEARCH_ENABLED: bool = True
+    RRF_K: int = 60
+    CONTEXT_MAX_TOKENS: int = 1500
+    CONTEXT_MAX_FIELD_TOKENS: int = 250
+    CONTEXT_DEDUPE_THRESHOLD: float = 0.8
+    # How often in-memory views of the tickets (BM25 index, semantic cache) check Milvus for writes by other processes
+    TICKETS_VERSION_CHECK_SECONDS: float = 10.0
+    
+    # Semantic Answer Cache Configuration
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000
+
+    # Sensor Anomaly Context Configuration (event log written by anomaly_stream.py at the repo root)
+    ANOMALY_CONTEXT_ENABLED: bool = True
+    ANOMALY_EVENTS_DB_PATH: str = "../Data/anomaly_events.sqlite3"
+    ANOMALY_WINDOW_MINUTES: int = 15
+    ANOMALY_CONTEXT_MAX_EVENTS: int = 5
+
     # Logging Configuration
     LOG_LEVEL: str = "INFO"
     
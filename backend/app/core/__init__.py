@@ -1,3 +1,3 @@
-from app.core import embeddings, rag
+from app.core import anomalies, cache, context, embeddings, ingestion, jobs, jsonstream, lexical, rag, semantic_cache
 
-__all__ = ["embeddings", "rag"] 
\ No newline at end of file
+__all__ = ["anomalies", "cache", "context", "embeddings", "ingestion", "jobs", "jsonstream", "lexical", "rag", "semantic_cache"] 
\ No newline at end of file
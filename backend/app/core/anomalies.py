@@ -0,0 +1,158 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from app.core.lexical import tokenize
+
+# Ticket vocabulary each sensor family points at, matched against the sensor name's prefix
+SENSOR_TERMS = {
+    "temperature": ["temperature", "overheating", "overheat", "thermal", "heat", "coolant", "chiller", "cooling"],
+    "vibration": ["vibration", "chatter", "spindle", "bearing", "bearings", "imbalance", "noise"],
+    "force": ["force", "load", "overload", "torque", "servo", "tool", "cutting"],
+    "position": ["position", "positioning", "axis", "backlash", "ballscrew", "ball", "screw", "linear", "guides", "encoder", "servo"],
+    "acoustic_emission": ["noise", "acoustic", "chatter", "tool", "wear", "bearing", "grinding"],
+    "pressure": ["pressure", "pneumatic", "hydraulic", "air"],
+    "current": ["current", "power", "electrical", "motor", "drive"]
+}
+
+# Ticket fields searched for those terms
+ANOMALY_MATCH_FIELDS = ["issue_description", "root_cause", "affected_components"]
+
+def sensor_terms(sensor: str) -> List[str]:
+    """Ticket terms for a sensor such as "vibration_X_g" or "position_Z_mm"; axis sensors add the axis"""
+    name = sensor.lower()
+    terms = []
+    for prefix, words in SENSOR_TERMS.items():
+        if name.startswith(prefix):
+            terms.extend(words)
+    parts = name.split("_")
+    if len(parts) > 1 and parts[1] in ("x", "y", "z"):
+        terms.append(f"{parts[1]}-axis")
+    return terms
+
+def _utc_iso(timestamp: datetime) -> str:
+    # Naive timestamps are taken as UTC, as the streaming service stores them
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc).isoformat()
+
+class AnomalyStore:
+    """
+    Read side of the anomaly event log that anomaly_stream.py writes as sensor readings
+    arrive. Summaries are aggregated from events already scored, so diagnosing a ticket
+    never runs the detectors or loads raw sensor history.
+    """
+    def __init__(self, path: str, window_minutes: int = 15, max_events: int = 5):
+        self.path = path
+        self.window_minutes = window_minutes
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        # The streaming service creates the file; until then there is nothing to read
+        if self._conn is None and os.path.exists(self.path):
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        return self._conn
+
+    def summarize(self, machine_id: str, timestamp: Optional[datetime] = None, window_minutes: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Summary of a machine's anomaly events within window_minutes of timestamp (now by
+        default), or None when no event was recorded in that window
+        """
+        center = timestamp or datetime.now(timezone.utc)
+        delta = timedelta(minutes=window_minutes or self.window_minutes)
+        start, end = _utc_iso(center - delta), _utc_iso(center + delta)
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return None
+            rows = conn.execute(
+                "SELECT timestamp, vote, flags, z_scores, top_sensors FROM anomaly_events "
+                "WHERE machine_id = ? AND timestamp >= ? AND timestamp <= ? ORDER BY timestamp",
+                (machine_id, start, end)
+            ).fetchall()
+        if not rows:
+            return None
+
+        events = []
+        sensors: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"events": 0, "max_abs_z": 0.0})
+        for ts, vote, flags, z_scores, top_sensors in rows:
+            z_scores = json.loads(z_scores)
+            for sensor in json.loads(top_sensors):
+                stats = sensors[sensor]
+                stats["events"] += 1
+                stats["max_abs_z"] = max(stats["max_abs_z"], abs(z_scores.get(sensor) or 0.0))
+            events.append({"timestamp": ts, "vote": vote, "flags": json.loads(flags), "top_sensors": json.loads(top_sensors)})
+
+        ranked_sensors = sorted(sensors.items(), key=lambda item: (item[1]["events"], item[1]["max_abs_z"]), reverse=True)
+        return {
+            "machine_id": machine_id,
+            "window_start": start,
+            "window_end": end,
+            "event_count": len(events),
+            "first_event": events[0]["timestamp"],
+            "last_event": events[-1]["timestamp"],
+            "max_vote": max(event["vote"] for event in events),
+            "sensors": [{"sensor": sensor, **stats} for sensor, stats in ranked_sensors],
+            "events": sorted(events, key=lambda event: event["vote"], reverse=True)[:self.max_events]
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def rank_by_anomalies(tickets: List[Dict[str, Any]], summary: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Tickets whose text or components mention what the anomalous sensors measure, most
+    matching terms first; tickets with no match are left out
+    """
+    terms = set()
+    for sensor in summary["sensors"]:
+        terms.update(sensor_terms(sensor["sensor"]))
+    if not terms:
+        return []
+    scored = []
+    for ticket in tickets:
+        values = [ticket.get(field) or "" for field in ANOMALY_MATCH_FIELDS]
+        text = " ".join(" ".join(value) if isinstance(value, list) else str(value) for value in values)
+        matches = len(terms.intersection(tokenize(text)))
+        if matches:
+            scored.append((matches, ticket))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [ticket for _, ticket in scored]
+
+def format_anomaly_context(summary: Dict[str, Any]) -> str:
+    """Render a summary as the sensor section of the diagnosis prompt"""
+    lines = [
+        f"Sensor anomalies on {summary['machine_id']} between {summary['window_start']} and {summary['window_end']}: "
+        f"{summary['event_count']} anomalous readings, first at {summary['first_event']}, last at {summary['last_event']}."
+    ]
+    for sensor in summary["sensors"]:
+        lines.append(f"- {sensor['sensor']}: among the top deviating sensors in {sensor['events']} readings, max |z| {sensor['max_abs_z']:.1f}")
+    lines.append("Most severe readings:")
+    for event in summary["events"]:
+        detectors = ", ".join(name for name, flag in event["flags"].items() if flag)
+        lines.append(f"- {event['timestamp']}: flagged by {detectors}; top sensors {', '.join(event['top_sensors'])}")
+    return "\n".join(lines) + "\n"
+
+@lru_cache()
+def get_anomaly_store() -> Optional[AnomalyStore]:
+    """
+    Process-wide reader of the anomaly event log configured from settings, or None when disabled
+    """
+    from app.config import get_settings
+    settings = get_settings()
+    if not settings.ANOMALY_CONTEXT_ENABLED:
+        return None
+    return AnomalyStore(
+        settings.ANOMALY_EVENTS_DB_PATH,
+        window_minutes=settings.ANOMALY_WINDOW_MINUTES,
+        max_events=settings.ANOMALY_CONTEXT_MAX_EVENTS
+    )
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional
+
+def normalize_text(text: str) -> str:
+    """
+    Collapse whitespace so trivially different copies of a text share a cache entry
+    """
+    return " ".join(text.split())
+
+def make_cache_key(model: str, text: str) -> str:
+    """
+    Content-addressed key: model name plus a SHA-256 of the normalized text
+    """
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: an in-process LRU in front of a SQLite store of
+    float32 vectors. The on-disk tier is evicted least-recently-used first once
+    it grows past max_disk_bytes.
+    """
+    def __init__(self, path: Optional[str] = None, max_memory_items: int = 10000, max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_bytes = 0
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, nbytes INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+            self._conn.commit()
+            self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up embeddings for texts, returning None for every miss
+        """
+        keys = [make_cache_key(model, text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        disk_hits = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                embedding = self._memory.get(key)
+                if embedding is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = embedding
+                elif self._conn is not None:
+                    row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        embedding = array("f", row[0]).tolist()
+                        self._remember(key, embedding)
+                        results[i] = embedding
+                        disk_hits.append(key)
+            if disk_hits:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in disk_hits])
+                self._conn.commit()
+        return results
+
+    def set(self, model: str, text: str, embedding: List[float]):
+        self.set_many(model, [text], [embedding])
+
+    def set_many(self, model: str, texts: List[str], embeddings: List[List[float]]):
+        """
+        Store embeddings in both tiers
+        """
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                key = make_cache_key(model, text)
+                self._remember(key, list(embedding))
+                if self._conn is not None:
+                    blob = array("f", embedding).tobytes()
+                    rows.append((key, blob, len(blob), now))
+            if rows:
+                for key, _, nbytes, _ in rows:
+                    existing = self._conn.execute("SELECT nbytes FROM embeddings WHERE key = ?", (key,)).fetchone()
+                    if existing is not None:
+                        self._disk_bytes -= existing[0]
+                    self._disk_bytes += nbytes
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, nbytes, last_access) VALUES (?, ?, ?, ?)", rows
+                )
+                self._evict_disk()
+                self._conn.commit()
+
+    def _remember(self, key: str, embedding: List[float]):
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        """Drop least-recently-used rows until the store fits in max_disk_bytes"""
+        while self._disk_bytes > self.max_disk_bytes:
+            rows = self._conn.execute(
+                "SELECT key, nbytes FROM embeddings ORDER BY last_access ASC LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+            evicted = []
+            for key, nbytes in rows:
+                evicted.append((key,))
+                self._disk_bytes -= nbytes
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+                self._disk_bytes = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+@lru_cache()
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Process-wide embedding cache configured from settings, or None when disabled
+    """
+    from app.config import get_settings
+    settings = get_settings()
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    return EmbeddingCache(
+        path=settings.EMBEDDING_CACHE_PATH or None,
+        max_memory_items=settings.EMBEDDING_CACHE_MEMORY_ITEMS,
+        max_disk_bytes=settings.EMBEDDING_CACHE_MAX_BYTES
+    )
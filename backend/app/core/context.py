@@ -0,0 +1,89 @@
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.embeddings import estimate_tokens, truncate_to_tokens
+from app.core.lexical import tokenize
+
+CONTEXT_HEADER = "Similar past issues and their solutions:\n\n"
+
+# Fields cut below this many tokens are left out rather than sent as a stub
+MIN_FIELD_TOKENS = 16
+
+# (label, ticket field) in the order they matter to the diagnosis
+CONTEXT_FIELDS = [
+    ("Issue", "issue_description"),
+    ("Solution", "resolution_solution"),
+    ("Root Cause", "root_cause")
+]
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+class ContextBuilder:
+    """
+    Assembles the retrieved-tickets section of the prompt within a token budget.
+    Tickets are taken in retrieval order; near-duplicates of an already included
+    ticket are skipped, each field is capped at max_field_tokens, and lower-ranked
+    tickets are dropped (or their trailing fields cut) once the budget runs out.
+    """
+    def __init__(self, max_tokens: int = 1500, max_field_tokens: int = 250, dedupe_threshold: float = 0.8):
+        self.max_tokens = max_tokens
+        self.max_field_tokens = max_field_tokens
+        self.dedupe_threshold = dedupe_threshold
+
+    def build(self, tickets: List[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Return the context text and a report of what was included, truncated and dropped
+        """
+        parts = [CONTEXT_HEADER]
+        used = estimate_tokens(CONTEXT_HEADER)
+        included_terms: List[set] = []
+        report = {"included": [], "truncated": [], "dropped": [], "tokens": 0, "budget": self.max_tokens}
+
+        for ticket in tickets:
+            ticket_id = ticket.get("ticket_id") or ticket.get("id")
+            terms = set(tokenize(" ".join(str(ticket.get(field) or "") for _, field in CONTEXT_FIELDS)))
+            if any(_jaccard(terms, seen) >= self.dedupe_threshold for seen in included_terms):
+                report["dropped"].append({"ticket_id": ticket_id, "reason": "near_duplicate"})
+                continue
+
+            block, block_tokens, truncated = self._render(ticket, self.max_tokens - used)
+            if block is None:
+                report["dropped"].append({"ticket_id": ticket_id, "reason": "token_budget"})
+                continue
+
+            parts.append(block)
+            used += block_tokens
+            included_terms.append(terms)
+            report["included"].append(ticket_id)
+            if truncated:
+                report["truncated"].append(ticket_id)
+
+        report["tokens"] = used
+        return "".join(parts), report
+
+    def _render(self, ticket: Dict[str, Any], remaining: int) -> Tuple[Optional[str], int, bool]:
+        """Render one ticket into at most `remaining` tokens; None if not even a useful issue line fits"""
+        remaining -= 1  # blank line after the block
+        lines = []
+        used = 0
+        truncated = False
+        for label, field in CONTEXT_FIELDS:
+            value = str(ticket.get(field) or "")
+            capped = truncate_to_tokens(value, self.max_field_tokens)
+            truncated = truncated or capped != value
+            line = f"{label}: {capped}\n"
+            tokens = estimate_tokens(line)
+            if used + tokens > remaining:
+                room = remaining - used - estimate_tokens(f"{label}: \n")
+                if room >= MIN_FIELD_TOKENS:
+                    line = f"{label}: {truncate_to_tokens(value, room)}\n"
+                    lines.append(line)
+                    used += estimate_tokens(line)
+                truncated = True
+                break
+            lines.append(line)
+            used += tokens
+        if not lines:
+            return None, 0, False
+        return "".join(lines) + "\n", used + 1, truncated
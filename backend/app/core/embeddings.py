@@ -1,29 +1,191 @@
-from openai import OpenAI
-from typing import List
+from openai import OpenAI, AsyncOpenAI
+import asyncio
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
 from app.config import get_settings
+from app.core.cache import EmbeddingCache, get_embedding_cache
+from loguru import logger
 
 settings = get_settings()
 
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception as e:
+    # Missing package, or an offline host that cannot download the encoding on first use
+    logger.warning(f"tiktoken unavailable ({e}); token budgets use a ~4 chars/token estimate")
+    _encoding = None
+
+def estimate_tokens(text: str) -> int:
+    """
+    Count tokens for a text, falling back to a ~4 chars/token estimate without tiktoken
+    """
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut a text down to at most max_tokens tokens, marking the cut with an ellipsis
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if _encoding is not None:
+        return _encoding.decode(_encoding.encode(text)[:max(max_tokens - 1, 0)]).rstrip() + "…"
+    return text[:max(max_tokens - 1, 0) * 4].rstrip() + "…"
+
 class EmbeddingGenerator:
-    def __init__(self):
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
         self.client = OpenAI()  # This will use the OPENAI_API_KEY environment variable automatically
+        self.model = settings.EMBEDDING_MODEL
+        self.cache = cache if cache is not None else get_embedding_cache()
 
     def generate_embedding(self, text: str) -> List[float]:
         """
         Generate embedding for a given text using OpenAI's Ada model
         """
+        if self.cache is not None:
+            cached = self.cache.get(self.model, text)
+            if cached is not None:
+                return cached
+
         response = self.client.embeddings.create(
-            model="text-embedding-ada-002",
+            model=self.model,
             input=text
         )
-        return response.data[0].embedding
+        embedding = response.data[0].embedding
+        if self.cache is not None:
+            self.cache.set(self.model, text, embedding)
+        return embedding
 
     def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """
-        Generate embeddings for a batch of texts
+        Generate embeddings for a batch of texts, only sending cache misses to the API
         """
+        if self.cache is None:
+            return self._create_embeddings(texts)
+
+        embeddings = self.cache.get_many(self.model, texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            created = self._create_embeddings(missing_texts)
+            self.cache.set_many(self.model, missing_texts, created)
+            for i, embedding in zip(missing, created):
+                embeddings[i] = embedding
+        return embeddings
+
+    def _create_embeddings(self, texts: List[str]) -> List[List[float]]:
         response = self.client.embeddings.create(
-            model="text-embedding-ada-002",
+            model=self.model,
+            input=texts
+        )
+        # The API does not guarantee response order, so sort on the returned index
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def close(self):
+        self.client.close()
+
+class AsyncEmbeddingGenerator:
+    """
+    Async counterpart of EmbeddingGenerator backed by the AsyncOpenAI client
+    """
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
+        self.client = AsyncOpenAI()  # This will use the OPENAI_API_KEY environment variable automatically
+        self.model = settings.EMBEDDING_MODEL
+        self.cache = cache if cache is not None else get_embedding_cache()
+
+    async def generate_embedding(self, text: str) -> List[float]:
+        """
+        Generate embedding for a given text without blocking the event loop
+        """
+        return (await self.generate_embeddings_batch([text]))[0]
+
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for a batch of texts, only sending cache misses to the API
+        """
+        if self.cache is None:
+            return await self._create_embeddings(texts)
+
+        # The cache falls back to SQLite on a memory miss; keep that disk I/O off the event loop
+        embeddings = await asyncio.to_thread(self.cache.get_many, self.model, texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            created = await self._create_embeddings(missing_texts)
+            await asyncio.to_thread(self.cache.set_many, self.model, missing_texts, created)
+            for i, embedding in zip(missing, created):
+                embeddings[i] = embedding
+        return embeddings
+
+    async def _create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        response = await self.client.embeddings.create(
+            model=self.model,
             input=texts
         )
-        return [item.embedding for item in response.data] 
\ No newline at end of file
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    async def close(self):
+        await self.client.close()
+
+class EmbeddingPipeline:
+    """
+    Embeds many texts by splitting them into size- and token-limited batches
+    and sending several batches to the embedding API at once.
+    Results are returned in the same order as the input texts.
+    """
+    def __init__(
+        self,
+        embedding_generator: Optional[EmbeddingGenerator] = None,
+        batch_size: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+        max_workers: Optional[int] = None
+    ):
+        self.embedding_generator = embedding_generator or EmbeddingGenerator()
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.max_batch_tokens = max_batch_tokens or settings.EMBEDDING_MAX_BATCH_TOKENS
+        self.max_workers = max_workers or settings.EMBEDDING_CONCURRENCY
+
+    def make_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Group text indices into batches that respect both the item and token limits
+        """
+        batches = []
+        current = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if current and (len(current) >= self.batch_size or current_tokens + tokens > self.max_batch_tokens):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for all texts, running up to max_workers batches concurrently
+        """
+        if not texts:
+            return []
+
+        batches = self.make_batches(texts)
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+
+        def run_batch(indices: List[int]):
+            return indices, self.embedding_generator.generate_embeddings_batch([texts[i] for i in indices])
+
+        if len(batches) == 1:
+            results = [run_batch(batches[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                results = list(executor.map(run_batch, batches))
+
+        for indices, batch_embeddings in results:
+            for i, embedding in zip(indices, batch_embeddings):
+                embeddings[i] = embedding
+        return embeddings
@@ -0,0 +1,295 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from app.config import get_settings
+from app.core.embeddings import EmbeddingPipeline
+from app.core.jsonstream import iter_keyed_records
+from app.database.milvus import MilvusClient
+
+settings = get_settings()
+
+def format_ticket(ticket: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a raw ticket export record (camelCase) onto the tickets collection schema
+    """
+    return {
+        "id": ticket["ticketID"],
+        "ticket_id": ticket["ticketID"],
+        "machine_model": ticket["machineModel"],
+        "serial_number": ticket["serialNumber"],
+        "issue_description": ticket["issueDescription"],
+        "affected_components": ticket["affectedComponents"],
+        "customer": ticket["customer"],
+        "reported_date": datetime.strptime(ticket["reportedDate"], "%Y-%m-%d %H:%M"),
+        "priority": ticket["priority"],
+        "status": ticket["status"],
+        "resolution_solution": ticket.get("resolutionSolution", ""),
+        "root_cause": ticket.get("rootCause", ""),
+        "resolution_date": datetime.strptime(ticket["resolutionDate"], "%Y-%m-%d %H:%M") if ticket.get("resolutionDate") else None,
+        "technician": ticket.get("technician", "")
+    }
+
+def format_team_member(member: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a raw team member record onto the team knowledge collection schema
+    """
+    return {
+        "id": member["employee_id"],
+        "employee_id": member["employee_id"],
+        "name": member["name"],
+        "role": member["role"],
+        "skills": member["skills"],
+        "certifications": member["certifications"],
+        "resolved_issues": member["resolved_issues"],
+        "experience_years": member["experience_years"],
+        "region": member["region"]
+    }
+
+def ticket_embedding_text(ticket: Dict[str, Any]) -> str:
+    return ticket["issue_description"]
+
+def team_member_embedding_text(member: Dict[str, Any]) -> str:
+    return f"{member['name']} {member['role']} {' '.join(member['skills'])} {' '.join(member['certifications'])}"
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """
+    SHA-256 over every stored field except the primary key and embedding, so the same
+    content always hashes the same regardless of the id it was uploaded under
+    """
+    payload = {key: value for key, value in record.items() if key not in ("id", "embedding", "content_hash")}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+# How each kind of source record is parsed, embedded and stored
+RECORD_KINDS: Dict[str, Dict[str, Any]] = {
+    "tickets": {
+        "key": "tickets",
+        "collection": "tickets",
+        "format": format_ticket,
+        "text": ticket_embedding_text,
+        "upsert": "upsert_tickets"
+    },
+    "team_members": {
+        "key": "team_members",
+        "collection": "team_knowledge",
+        "format": format_team_member,
+        "text": team_member_embedding_text,
+        "upsert": "upsert_team_members"
+    }
+}
+
+def detect_kind(record: Dict[str, Any]) -> Optional[str]:
+    """
+    Tell a raw ticket from a raw team member record, for sources that mix both
+    """
+    if "ticketID" in record:
+        return "tickets"
+    if "employee_id" in record:
+        return "team_members"
+    return None
+
+def is_json_lines(name: str) -> bool:
+    return name.endswith((".jsonl", ".ndjson"))
+
+def iter_kind_records(f: TextIO, json_lines: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream (kind, raw record) pairs from an open text file without loading it whole.
+    Records under a "tickets" or "team_members" key take that kind; records of JSON
+    Lines files and bare arrays are classified by their fields.
+    """
+    keys = [config["key"] for config in RECORD_KINDS.values()]
+    for key, record in iter_keyed_records(f, keys, json_lines=json_lines):
+        kind = key or detect_kind(record)
+        if kind is None:
+            raise ValueError(f"Cannot tell whether record is a ticket or a team member: {sorted(record)[:5]}")
+        yield kind, record
+
+def iter_source_records(path: str, kind: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the raw records of one kind from a JSON or JSON Lines file
+    """
+    with open(path, "r") as f:
+        for record_kind, record in iter_kind_records(f, json_lines=is_json_lines(path)):
+            if record_kind == kind:
+                yield record
+
+def batched(records: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class IngestionCheckpoint:
+    """
+    Progress marker for one record kind of one source file, stored as a small JSON
+    file. It records how many records of that kind have been committed to the target
+    collection and the file's size and mtime; a changed file starts over from the
+    beginning (content-hash dedupe still skips what is already stored). A file holding
+    both tickets and team members gets one checkpoint per kind.
+    """
+    def __init__(self, source_path: str, checkpoint_dir: str, kind: str, collection: str):
+        self.source_path = os.path.abspath(source_path)
+        key = f"{self.source_path}\n{kind}\n{collection}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(checkpoint_dir, f"{os.path.basename(source_path)}.{kind}.{digest}.json")
+        stat = os.stat(self.source_path)
+        self.fingerprint = {"kind": kind, "collection": collection, "size": stat.st_size, "mtime": stat.st_mtime}
+        self.committed = 0
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+            if saved.get("fingerprint") == self.fingerprint:
+                self.committed = saved.get("committed", 0)
+
+    def save(self, committed: int, done: bool = False):
+        self.committed = committed
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "source": self.source_path,
+                "fingerprint": self.fingerprint,
+                "committed": committed,
+                "done": done,
+                "updated_at": time.time()
+            }, f)
+        # Atomic replace, so a crash never leaves a half-written checkpoint
+        os.replace(tmp_path, self.path)
+
+    def reset(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.committed = 0
+
+class BulkIngestor:
+    """
+    Streams records from a source file into Milvus in batches. Records are keyed by
+    their source id (ticket_id / employee_id); each batch is compared with what is
+    stored under those keys, only changed records are upserted (and only reworded ones
+    re-embedded), and progress is checkpointed so an interrupted run resumes after
+    the last committed batch.
+    """
+    def __init__(
+        self,
+        milvus_client: Optional[MilvusClient] = None,
+        embedding_pipeline: Optional[EmbeddingPipeline] = None,
+        batch_size: Optional[int] = None,
+        checkpoint_dir: Optional[str] = None
+    ):
+        self.milvus_client = milvus_client or MilvusClient()
+        self.embedding_pipeline = embedding_pipeline or EmbeddingPipeline()
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.checkpoint_dir = checkpoint_dir or settings.INGEST_CHECKPOINT_DIR
+
+    def ingest_file(
+        self,
+        path: str,
+        kind: str,
+        resume: bool = True,
+        progress: Optional[Callable[[Dict[str, int]], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Ingest one source file of `kind` ("tickets" or "team_members") and return counts
+        """
+        checkpoint = IngestionCheckpoint(path, self.checkpoint_dir, kind, RECORD_KINDS[kind]["collection"])
+        if not resume:
+            checkpoint.reset()
+        records = iter_source_records(path, kind)
+        stats = self.ingest_records(records, kind, checkpoint, progress)
+        checkpoint.save(checkpoint.committed, done=True)
+        return stats
+
+    def ingest_stream(
+        self,
+        f: TextIO,
+        json_lines: bool = False,
+        progress: Optional[Callable[[Dict[str, Dict[str, int]]], None]] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Ingest every ticket and team member of an open upload, batch by batch, returning
+        counts per kind. `progress` receives the running counts after each batch.
+        """
+        results: Dict[str, Dict[str, int]] = {}
+        for kind, group in groupby(iter_kind_records(f, json_lines=json_lines), key=lambda pair: pair[0]):
+            base = results.get(kind, {})
+
+            def update(stats: Dict[str, int], kind: str = kind, base: Dict[str, int] = base):
+                results[kind] = {key: base.get(key, 0) + value for key, value in stats.items()}
+                if progress:
+                    progress(results)
+
+            stats = self.ingest_records((record for _, record in group), kind, progress=update)
+            results[kind] = {key: base.get(key, 0) + value for key, value in stats.items()}
+        return results
+
+    def ingest_records(
+        self,
+        records: Iterable[Dict[str, Any]],
+        kind: str,
+        checkpoint: Optional[IngestionCheckpoint] = None,
+        progress: Optional[Callable[[Dict[str, int]], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Ingest raw records in batches; with a checkpoint, the first `committed` records are skipped
+        """
+        config = RECORD_KINDS[kind]
+        stats = {"read": 0, "skipped_checkpoint": 0, "unchanged": 0, "inserted": 0, "updated": 0, "embedded": 0}
+        start = checkpoint.committed if checkpoint else 0
+
+        for batch in batched(records, self.batch_size):
+            if stats["read"] + len(batch) <= start:
+                stats["read"] += len(batch)
+                stats["skipped_checkpoint"] += len(batch)
+                continue
+            offset = max(start - stats["read"], 0)
+            stats["read"] += len(batch)
+            stats["skipped_checkpoint"] += offset
+
+            formatted = [config["format"](record) for record in batch[offset:]]
+            # The last copy of a record repeated within one batch wins, as it would across batches
+            formatted = list({record["id"]: record for record in formatted}.values())
+            for record in formatted:
+                record["content_hash"] = content_hash(record)
+            self._write_changed(config, formatted, stats)
+
+            if checkpoint:
+                checkpoint.save(stats["read"])
+            if progress:
+                progress(dict(stats))
+        return stats
+
+    def _write_changed(self, config: Dict[str, Any], records: List[Dict[str, Any]], stats: Dict[str, int]):
+        """
+        Compare records with what is stored under the same key: identical ones are
+        skipped, ones whose embedded text is unchanged reuse the stored vector, and only
+        new or reworded records are sent to the embedding API
+        """
+        stored = self.milvus_client.fetch_records(config["collection"], [r["id"] for r in records], with_embedding=True)
+        changed, embeddings, to_embed = [], [], []
+        for record in records:
+            previous = stored.get(record["id"])
+            if previous is not None and previous.get("content_hash") == record["content_hash"]:
+                stats["unchanged"] += 1
+                continue
+            stats["updated" if previous is not None else "inserted"] += 1
+            changed.append(record)
+            if previous is not None and config["text"](previous) == config["text"](record):
+                embeddings.append(previous["embedding"])
+            else:
+                embeddings.append(None)
+                to_embed.append(len(changed) - 1)
+        if not changed:
+            return
+        if to_embed:
+            fresh = self.embedding_pipeline.embed([config["text"](changed[i]) for i in to_embed])
+            for i, embedding in zip(to_embed, fresh):
+                embeddings[i] = embedding
+            stats["embedded"] += len(to_embed)
+        getattr(self.milvus_client, config["upsert"])(changed, embeddings)
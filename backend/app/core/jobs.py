@@ -0,0 +1,330 @@
+import io
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+from app.core.ingestion import BulkIngestor
+
+JOB_STATUSES = ["queued", "running", "completed", "failed", "cancelled"]
+FINISHED_STATUSES = {"completed", "failed", "cancelled"}
+
+class JobCancelled(Exception):
+    pass
+
+class IngestionJobStore:
+    """
+    Persistent queue of knowledge base upload jobs in SQLite, shared by every API
+    process. A running job records its owner (host:pid) and its owner keeps updated_at
+    fresh; jobs whose heartbeat went stale because their process died are queued again
+    (ingestion is idempotent, so already stored records are skipped on the rerun).
+    """
+    def __init__(self, path: str):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingestion_jobs ("
+            "id TEXT PRIMARY KEY, filename TEXT, path TEXT NOT NULL, json_lines INTEGER NOT NULL, "
+            "status TEXT NOT NULL, total_bytes INTEGER NOT NULL, processed_bytes INTEGER NOT NULL DEFAULT 0, "
+            "stats TEXT NOT NULL DEFAULT '{}', error TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, started_at REAL, updated_at REAL NOT NULL, finished_at REAL, owner TEXT)"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(ingestion_jobs)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE ingestion_jobs ADD COLUMN owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs (status, created_at)")
+        self._conn.commit()
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def create(self, path: str, filename: Optional[str], json_lines: bool, job_id: Optional[str] = None) -> Dict[str, Any]:
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO ingestion_jobs (id, filename, path, json_lines, status, total_bytes, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+            (job_id, filename, path, int(json_lines), os.path.getsize(path), now, now)
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            if status:
+                rows = self._conn.execute(
+                    "SELECT * FROM ingestion_jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute("SELECT * FROM ingestion_jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """
+        Move the oldest queued job to running, owned by this process, and return it.
+        The update only succeeds while the job is still queued, so when several
+        processes race for the same job exactly one of them gets it.
+        """
+        with self._lock:
+            while True:
+                row = self._conn.execute(
+                    "SELECT id FROM ingestion_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                cursor = self._conn.execute(
+                    "UPDATE ingestion_jobs SET status = 'running', owner = ?, started_at = ?, updated_at = ? "
+                    "WHERE id = ? AND status = 'queued'",
+                    (self.owner, now, now, row["id"])
+                )
+                self._conn.commit()
+                if cursor.rowcount == 1:
+                    break
+        return self.get(row["id"])
+
+    def owns(self, job_id: str) -> bool:
+        """Whether the job is still running under this process"""
+        with self._lock:
+            row = self._conn.execute("SELECT status, owner FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["status"] == "running" and row["owner"] == self.owner)
+
+    def heartbeat(self) -> int:
+        """Refresh updated_at of every job this process is running"""
+        return self._execute(
+            "UPDATE ingestion_jobs SET updated_at = ? WHERE status = 'running' AND owner = ?",
+            (time.time(), self.owner)
+        ).rowcount
+
+    def update_progress(self, job_id: str, stats: Dict[str, Any], processed_bytes: int) -> bool:
+        """
+        Store progress and return whether the job should stop: cancellation was
+        requested or the job is no longer running under this process
+        """
+        self._execute(
+            "UPDATE ingestion_jobs SET stats = ?, processed_bytes = ?, updated_at = ? WHERE id = ? AND owner = ?",
+            (json.dumps(stats), processed_bytes, time.time(), job_id, self.owner)
+        )
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, owner, cancel_requested FROM ingestion_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return not row or bool(row["cancel_requested"]) or row["status"] != "running" or row["owner"] != self.owner
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None):
+        now = time.time()
+        self._execute(
+            "UPDATE ingestion_jobs SET status = ?, error = ?, updated_at = ?, finished_at = ? "
+            "WHERE id = ? AND status = 'running' AND owner = ?",
+            (status, error, now, now, job_id, self.owner)
+        )
+
+    def request_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a queued job at once, or flag a running one to stop after its current batch
+        """
+        now = time.time()
+        self._execute(
+            "UPDATE ingestion_jobs SET status = 'cancelled', updated_at = ?, finished_at = ? WHERE id = ? AND status = 'queued'",
+            (now, now, job_id)
+        )
+        self._execute(
+            "UPDATE ingestion_jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = 'running'",
+            (now, job_id)
+        )
+        return self.get(job_id)
+
+    def requeue(self, job_id: str):
+        self._execute(
+            "UPDATE ingestion_jobs SET status = 'queued', owner = NULL, started_at = NULL, updated_at = ? "
+            "WHERE id = ? AND status = 'running' AND owner = ?",
+            (time.time(), job_id, self.owner)
+        )
+
+    def requeue_interrupted(self, stale_after: float = 60.0) -> int:
+        """
+        Queue again the running jobs whose owner stopped sending heartbeats for
+        stale_after seconds (its process died); ones already asked to stop are marked
+        cancelled instead. Jobs of live processes are left alone.
+        """
+        now = time.time()
+        cutoff = now - stale_after
+        self._execute(
+            "UPDATE ingestion_jobs SET status = 'cancelled', updated_at = ?, finished_at = ? "
+            "WHERE status = 'running' AND cancel_requested = 1 AND updated_at < ?",
+            (now, now, cutoff)
+        )
+        return self._execute(
+            "UPDATE ingestion_jobs SET status = 'queued', owner = NULL, started_at = NULL, updated_at = ? "
+            "WHERE status = 'running' AND cancel_requested = 0 AND updated_at < ?",
+            (now, cutoff)
+        ).rowcount
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["json_lines"] = bool(job["json_lines"])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        job["stats"] = json.loads(job["stats"])
+        job["progress"] = job["processed_bytes"] / job["total_bytes"] if job["total_bytes"] else 1.0
+        records = sum(kind_stats.get("read", 0) for kind_stats in job["stats"].values())
+        elapsed = (job["finished_at"] or time.time()) - job["started_at"] if job["started_at"] else 0.0
+        job["records_processed"] = records
+        job["records_per_second"] = records / elapsed if elapsed > 0 else 0.0
+        job.pop("path")
+        return job
+
+    def path_of(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["path"] if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class IngestionWorkerPool:
+    """
+    Background threads that run queued upload jobs through a BulkIngestor, away from
+    request handling. The ingestor is built on the first job, with its own embedding
+    concurrency limit so bulk uploads leave API headroom for /diagnose traffic.
+    A monitor thread sends this process's heartbeats and requeues jobs of processes
+    that died, so several API processes can share one job store.
+    """
+    def __init__(
+        self,
+        store: IngestionJobStore,
+        ingestor_factory: Callable[[], BulkIngestor],
+        workers: int = 1,
+        poll_interval: float = 1.0,
+        heartbeat_interval: float = 10.0,
+        stale_after: float = 60.0
+    ):
+        self.store = store
+        self.ingestor_factory = ingestor_factory
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self._ingestor: Optional[BulkIngestor] = None
+        self._ingestor_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        self._requeue_stale()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._monitor, name="ingest-monitor", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _requeue_stale(self):
+        requeued = self.store.requeue_interrupted(self.stale_after)
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted ingestion job(s)")
+            self._wakeup.set()
+
+    def _monitor(self):
+        while not self._stopping.wait(self.heartbeat_interval):
+            try:
+                self.store.heartbeat()
+                self._requeue_stale()
+            except Exception as e:
+                logger.error(f"Ingestion job heartbeat failed: {e}")
+
+    def notify(self):
+        """Wake idle workers after a job was queued"""
+        self._wakeup.set()
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job; a queued one's upload file is removed right away
+        """
+        path = self.store.path_of(job_id)
+        job = self.store.request_cancel(job_id)
+        if job is not None and job["status"] == "cancelled" and path and os.path.exists(path):
+            os.remove(path)
+        return job
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stop taking new jobs and wait for running ones. A job still running at the
+        timeout is picked up again on the next start.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _get_ingestor(self) -> BulkIngestor:
+        with self._ingestor_lock:
+            if self._ingestor is None:
+                self._ingestor = self.ingestor_factory()
+            return self._ingestor
+
+    def _run(self):
+        while not self._stopping.is_set():
+            job = self.store.claim_next()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._process(job)
+
+    def _process(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        path = self.store.path_of(job_id)
+        logger.info(f"Ingestion job {job_id} started ({job['filename']}, {job['total_bytes']} bytes)")
+        try:
+            with open(path, "rb") as raw:
+                stream = io.TextIOWrapper(raw, encoding="utf-8")
+
+                def progress(stats: Dict[str, Dict[str, int]]):
+                    if self.store.update_progress(job_id, stats, raw.tell()) or self._stopping.is_set():
+                        raise JobCancelled()
+
+                stats = self._get_ingestor().ingest_stream(stream, json_lines=job["json_lines"], progress=progress)
+                self.store.update_progress(job_id, stats, job["total_bytes"])
+            self.store.finish(job_id, "completed")
+            logger.info(f"Ingestion job {job_id} completed: {stats}")
+        except JobCancelled:
+            if not self.store.owns(job_id):
+                # Declared stale and requeued; whoever claimed it again finishes it
+                logger.warning(f"Ingestion job {job_id} is no longer owned by this process; stopped")
+                return
+            if self._stopping.is_set() and not self.store.get(job_id)["cancel_requested"]:
+                # Shutting down: leave the job for the next start instead of cancelling it
+                self.store.requeue(job_id)
+                return
+            self.store.finish(job_id, "cancelled")
+            logger.info(f"Ingestion job {job_id} cancelled")
+        except Exception as e:
+            self.store.finish(job_id, "failed", error=str(e))
+            logger.error(f"Ingestion job {job_id} failed: {e}")
+        if self.store.get(job_id)["status"] in FINISHED_STATUSES and os.path.exists(path):
+            os.remove(path)
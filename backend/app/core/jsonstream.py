@@ -0,0 +1,158 @@
+import json
+from typing import Any, Iterable, Iterator, Optional, TextIO, Tuple
+
+_WHITESPACE = " \t\r\n"
+_NUMBER_CHARS = set("0123456789.eE+-")
+
+class JSONStreamReader:
+    """
+    Incremental reader for large JSON documents. It walks the top level of a document
+    (an array, or an object whose values are arrays) and decodes one array element at
+    a time, so memory holds a single record plus one read chunk regardless of file size.
+    Values under keys nobody asked for are skipped by scanning, never decoded.
+    """
+    def __init__(self, f: TextIO, chunk_size: int = 64 * 1024):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Read another chunk, dropping already consumed text; False at end of input"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> Optional[str]:
+        """Return the next non-whitespace character without consuming it, or None at end of input"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON stream, found {found!r}")
+        self.pos += 1
+
+    def read_value(self) -> Any:
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number cut by the buffer edge ("4444." | "5", "1e" | "10") decodes as its
+            # prefix; while only number characters follow it, read on before trusting it
+            if (isinstance(value, (int, float)) and not isinstance(value, bool) and not self.eof
+                    and all(char in _NUMBER_CHARS for char in self.buffer[end:]) and self._fill()):
+                continue
+            self.pos = end
+            return value
+
+    def skip_value(self):
+        """Consume the next JSON value without building it"""
+        if self.peek() not in ("{", "["):
+            self.read_value()
+            return
+        depth = 0
+        in_string = escaped = False
+        while True:
+            while self.pos < len(self.buffer):
+                char = self.buffer[self.pos]
+                self.pos += 1
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == "\\":
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = True
+                elif char in "{[":
+                    depth += 1
+                elif char in "}]":
+                    depth -= 1
+                    if depth == 0:
+                        return
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def iter_array(self) -> Iterator[Any]:
+        """Yield the elements of the array starting at the current position"""
+        self._expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.read_value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, found {separator!r}")
+
+    def iter_object_arrays(self, keys: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+        """
+        For a top-level object, yield (key, element) for every element of the arrays
+        stored under `keys`, in document order
+        """
+        keys = set(keys)
+        self._expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self._expect(":")
+            if key in keys and self.peek() == "[":
+                for item in self.iter_array():
+                    yield key, item
+            else:
+                self.skip_value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' in JSON object, found {separator!r}")
+
+def iter_json_lines(f: TextIO) -> Iterator[Any]:
+    """Yield one decoded value per non-blank line"""
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+def iter_keyed_records(f: TextIO, keys: Iterable[str], json_lines: bool = False) -> Iterator[Tuple[Optional[str], Any]]:
+    """
+    Stream (key, record) pairs from a JSON Lines file, a top-level JSON array, or the
+    arrays under `keys` of a top-level JSON object. Records from JSON Lines files and
+    bare arrays have no enclosing key, so it is None for them.
+    """
+    if json_lines:
+        for record in iter_json_lines(f):
+            yield None, record
+        return
+    reader = JSONStreamReader(f)
+    if reader.peek() == "[":
+        for record in reader.iter_array():
+            yield None, record
+        return
+    yield from reader.iter_object_arrays(keys)
@@ -0,0 +1,172 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Keeps error codes, part numbers and axis names such as "e-42", "mx-500" or "x-axis" as single tokens
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it",
+    "of", "on", "or", "that", "the", "to", "was", "were", "with"
+}
+
+TICKET_TEXT_FIELDS = ["issue_description", "root_cause", "resolution_solution"]
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokenizer. Compound tokens like "e-stop" are kept and also split into
+    their parts, so both "E-Stop" and "stop" queries match.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = re.split(r"[-_./]", token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part and part not in _STOPWORDS)
+    return tokens
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over tickets, keyed by the Milvus primary key.
+    Documents can be added or replaced one at a time as tickets are inserted.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+
+    def add(self, doc_id: str, ticket: Dict[str, Any]):
+        """
+        Index a ticket, replacing any previous version with the same id
+        """
+        text = " ".join(str(ticket.get(field) or "") for field in TICKET_TEXT_FIELDS)
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self.remove(doc_id)
+            for term, count in terms.items():
+                self._postings[term][doc_id] = count
+            self._doc_terms[doc_id] = terms
+            length = sum(terms.values())
+            self._doc_lengths[doc_id] = length
+            self._total_length += length
+            self._documents[doc_id] = {
+                key: value.isoformat() if hasattr(value, "isoformat") else value
+                for key, value in ticket.items() if key != "embedding"
+            }
+
+    def replace(self, tickets: Iterable[Dict[str, Any]]):
+        """
+        Rebuild the index from a fresh read of every ticket. Searches keep using the old
+        contents until the new ones are complete.
+        """
+        fresh = BM25Index(self.k1, self.b)
+        fresh.add_many(tickets)
+        with self._lock:
+            self._postings = fresh._postings
+            self._doc_terms = fresh._doc_terms
+            self._doc_lengths = fresh._doc_lengths
+            self._documents = fresh._documents
+            self._total_length = fresh._total_length
+            self.loaded = True
+
+    def add_many(self, tickets: Iterable[Dict[str, Any]]):
+        with self._lock:
+            for ticket in tickets:
+                self.add(ticket["id"], ticket)
+
+    def load(self, tickets: Iterable[Dict[str, Any]]):
+        """
+        Bulk-load the index (e.g. from Milvus at startup) and mark it as loaded
+        """
+        self.add_many(tickets)
+        self.loaded = True
+
+    def remove_many(self, doc_ids: Iterable[str]):
+        with self._lock:
+            for doc_id in doc_ids:
+                self.remove(doc_id)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            terms = self._doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= self._doc_lengths.pop(doc_id, 0)
+            self._documents.pop(doc_id, None)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Return up to `limit` (ticket, score) pairs ranked by BM25 score
+        """
+        with self._lock:
+            n_docs = len(self._doc_lengths)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            return [(dict(self._documents[doc_id]), score) for doc_id, score in ranked]
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], k: int = 60, key: str = "id") -> List[Dict[str, Any]]:
+    """
+    Merge several ranked ticket lists with reciprocal rank fusion: each ticket scores
+    sum(1 / (k + rank)) over the lists it appears in. The fused score is stored
+    on each returned ticket as "rrf_score".
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    tickets: Dict[str, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, ticket in enumerate(results, start=1):
+            doc_id = ticket[key]
+            scores[doc_id] += 1.0 / (k + rank)
+            # Prefer the first list's copy (the vector hit carries its distance)
+            tickets.setdefault(doc_id, ticket)
+    fused = []
+    for doc_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+        ticket = dict(tickets[doc_id])
+        ticket["rrf_score"] = score
+        fused.append(ticket)
+    return fused
+
+@lru_cache()
+def get_ticket_lexical_index() -> BM25Index:
+    """
+    Process-wide lexical index over tickets, updated whenever tickets are written or
+    deleted through MilvusClient in this process, and rebuilt from Milvus when the
+    tickets version watcher sees writes made by other processes
+    """
+    from app.database.milvus import on_tickets_changed, on_tickets_deleted, on_tickets_reloaded
+    index = BM25Index()
+    on_tickets_changed(index.add_many)
+    on_tickets_deleted(index.remove_many)
+    # Until the first load there is nothing to refresh
+    on_tickets_reloaded(lambda client: index.replace(client.iter_tickets()) if index.loaded else None)
+    return index
@@ -1,78 +1,615 @@
-from typing import List, Dict, Any
-from app.core.embeddings import EmbeddingGenerator
-from app.database.milvus import MilvusClient
-from openai import OpenAI
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+from datetime import datetime
+from app.core.anomalies import get_anomaly_store, rank_by_anomalies, format_anomaly_context
+from app.core.context import ContextBuilder
+from app.core.embeddings import EmbeddingGenerator, AsyncEmbeddingGenerator, estimate_tokens
+from app.core.lexical import get_ticket_lexical_index, reciprocal_rank_fusion
+from app.core.semantic_cache import get_semantic_cache
+from app.database.milvus import MilvusClient, AsyncMilvusClient, get_tickets_version_watcher
+from app.database.models import Diagnosis, DiagnosisResponse
+from openai import OpenAI, AsyncOpenAI
 from app.config import get_settings
+from loguru import logger
+import asyncio
+import json
+import re
 
 settings = get_settings()
 
+# Function-calling schema the model must answer with; arguments are validated against Diagnosis
+DIAGNOSIS_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "submit_diagnosis",
+        "description": "Submit the diagnosis of the current issue",
+        "parameters": Diagnosis.model_json_schema()
+    }
+}
+DIAGNOSIS_TOOL_CHOICE = {"type": "function", "function": {"name": "submit_diagnosis"}}
+
+# Diagnosis fields whose text is streamed to clients while the arguments are written
+STREAMED_FIELDS = ["summary", "suggested_fix"]
+
+_JSON_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+class StreamedFieldText:
+    """
+    Incremental reader of function-call arguments as they stream in. feed() takes the
+    next fragment of the JSON arguments and returns (field, text) pairs with the newly
+    decoded text of the wanted top-level string fields, so clients can show prose
+    instead of JSON fragments. Other values are skipped.
+    """
+    def __init__(self, fields: List[str]):
+        self.fields = set(fields)
+        self.text = ""
+        self.pos = 0
+        self.state = "start"
+        self.key: Optional[str] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, fragment: str) -> List[Tuple[str, str]]:
+        self.text += fragment
+        out: List[Tuple[str, str]] = []
+        while self.pos < len(self.text) and self.state != "done" and self._step(out):
+            pass
+        return out
+
+    def _step(self, out: List[Tuple[str, str]]) -> bool:
+        """Advance through the buffered text; False when more input is needed"""
+        char = self.text[self.pos]
+        if self.state != "string" and self.state != "skip" and char in " \t\r\n":
+            self.pos += 1
+        elif self.state == "start":
+            self.pos += 1
+            if char == "{":
+                self.state = "key"
+        elif self.state == "key":
+            if char == ",":
+                self.pos += 1
+            elif char == "}":
+                self.state = "done"
+            else:
+                try:
+                    self.key, self.pos = json.JSONDecoder().raw_decode(self.text, self.pos)
+                except json.JSONDecodeError:
+                    return False
+                self.state = "colon"
+        elif self.state == "colon":
+            self.pos += 1
+            self.state = "value" if char == ":" else "done"
+        elif self.state == "value":
+            if char == '"' and self.key in self.fields:
+                self.pos += 1
+                self.state = "string"
+            else:
+                self.state = "skip"
+                self._depth, self._in_string, self._escaped = 0, False, False
+        elif self.state == "string":
+            return self._read_string(out)
+        else:
+            self._skip()
+        return True
+
+    def _read_string(self, out: List[Tuple[str, str]]) -> bool:
+        chars = []
+        complete = True
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+            if char == '"':
+                self.pos += 1
+                self.state = "key"
+                break
+            if char != "\\":
+                chars.append(char)
+                self.pos += 1
+                continue
+            # Escapes are decoded only once all of their characters have arrived
+            escape = self.text[self.pos + 1:self.pos + 2]
+            if not escape:
+                complete = False
+                break
+            if escape != "u":
+                chars.append(_JSON_ESCAPES.get(escape, escape))
+                self.pos += 2
+                continue
+            length = 6
+            if self.text[self.pos + 2:self.pos + 3].lower() == "d" and self.text[self.pos + 3:self.pos + 4].lower() in "89ab":
+                length = 12  # high surrogate: decode together with its low half
+            if len(self.text) < self.pos + length:
+                complete = False
+                break
+            try:
+                chars.append(json.loads(f'"{self.text[self.pos:self.pos + length]}"'))
+            except ValueError:
+                chars.append(self.text[self.pos:self.pos + length])
+            self.pos += length
+        if chars:
+            out.append((self.key, "".join(chars)))
+        return complete
+
+    def _skip(self):
+        char = self.text[self.pos]
+        self.pos += 1
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+        elif char == '"':
+            self._in_string = True
+        elif char in "{[":
+            self._depth += 1
+        elif char in "]}" and self._depth:
+            self._depth -= 1
+        elif self._depth == 0 and char == ",":
+            self.state = "key"
+        elif self._depth == 0 and char == "}":
+            self.state = "done"
+
 class RAGEngine:
     def __init__(self):
         self.embedding_generator = EmbeddingGenerator()
         self.milvus_client = MilvusClient()
         self.client = OpenAI()  # This will use the OPENAI_API_KEY environment variable automatically
+        self.semantic_cache = get_semantic_cache()
+        self.anomaly_store = get_anomaly_store()
+        self.lexical_index = self._load_lexical_index(self.milvus_client)
 
-    def process_issue(self, issue_text: str) -> Dict[str, Any]:
+    def process_issue(self, issue_text: str, machine_id: Optional[str] = None, timestamp: Optional[datetime] = None) -> Dict[str, Any]:
         """
-        Process a new issue and return relevant solutions
+        Process a new issue and return relevant solutions. With a machine_id, the sensor
+        anomalies recorded for that machine around `timestamp` rerank the similar tickets
+        and go into the same prompt.
         """
+        self._check_tickets_version(self.milvus_client)
         # Generate embedding for the issue
         embedding = self.embedding_generator.generate_embedding(issue_text)
+        anomalies = self._anomaly_summary(machine_id, timestamp)
+        
+        # Reuse the diagnosis of a near-duplicate issue if one was answered recently
+        cached = self._lookup_cached_response(embedding, anomalies)
+        if cached is not None:
+            return cached
         
         # Search for similar tickets
-        similar_tickets = self.milvus_client.search_similar_tickets(embedding)
+        similar_tickets = self._retrieve(issue_text, embedding, anomalies)
         
         # Generate response using OpenAI
-        context = self._prepare_context(similar_tickets)
+        context = self._prepare_context(similar_tickets, anomalies)
         response = self._generate_response(issue_text, context)
         
+        return self._finish_response(embedding, response, anomalies)
+
+    def _load_lexical_index(self, milvus_client: MilvusClient):
+        """Return the shared lexical index, filling it from Milvus the first time"""
+        if not settings.HYBRID_SEARCH_ENABLED:
+            return None
+        index = get_ticket_lexical_index()
+        if not index.loaded:
+            # Record the version first, so writes made while loading trigger a reload
+            get_tickets_version_watcher().check(milvus_client)
+            index.load(milvus_client.iter_tickets())
+        return index
+
+    def _check_tickets_version(self, milvus_client: MilvusClient):
+        """
+        Rebuild the lexical index and drop cached answers when other processes have
+        written tickets since the last check
+        """
+        if self.lexical_index is None and self.semantic_cache is None:
+            return
+        try:
+            get_tickets_version_watcher().check(milvus_client)
+        except Exception as e:
+            logger.warning(f"Tickets version check failed, keeping the current lexical index and cache: {e}")
+
+    def _retrieve(self, issue_text: str, embedding: List[float], anomalies: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve similar tickets: vector hits from Milvus, fused with BM25 hits on the
+        ticket text when hybrid search is enabled and with the anomaly ranking when
+        sensor anomalies were recorded
+        """
+        if not self._needs_fusion(anomalies):
+            return self.milvus_client.search_similar_tickets(embedding, settings.RAG_TOP_K)
+        vector_hits = self.milvus_client.search_similar_tickets(embedding, settings.RAG_CANDIDATE_K)
+        return self._fuse(issue_text, vector_hits, anomalies)
+
+    def _needs_fusion(self, anomalies: Optional[Dict[str, Any]] = None) -> bool:
+        return self.lexical_index is not None or anomalies is not None
+
+    def _fuse(self, issue_text: str, vector_hits: List[Dict[str, Any]], anomalies: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        ranked_lists = [vector_hits]
+        if self.lexical_index is not None:
+            ranked_lists.append([ticket for ticket, _ in self.lexical_index.search(issue_text, settings.RAG_CANDIDATE_K)])
+        if anomalies is not None:
+            # Candidates from every list, ranked by how well they match the anomalous sensors
+            candidates = {ticket["id"]: ticket for results in ranked_lists for ticket in results}
+            ranked_lists.append(rank_by_anomalies(list(candidates.values()), anomalies))
+        return reciprocal_rank_fusion(ranked_lists, k=settings.RRF_K)[:settings.RAG_TOP_K]
+
+    def _anomaly_summary(self, machine_id: Optional[str], timestamp: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Precomputed anomaly summary of the machine around timestamp, None without a machine or events"""
+        if self.anomaly_store is None or not machine_id:
+            return None
+        return self.anomaly_store.summarize(machine_id, timestamp)
+
+    def _lookup_cached_response(self, embedding: List[float], anomalies: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        # A cached answer to a similar text was not grounded on these anomalies
+        if self.semantic_cache is None or anomalies is not None:
+            return None
+        return self.semantic_cache.lookup(embedding)
+
+    def _store_cached_response(self, embedding: List[float], response: Dict[str, Any]):
+        if self.semantic_cache is not None:
+            self.semantic_cache.store(embedding, response)
+
+    def _finish_response(self, embedding: List[float], response: Dict[str, Any], anomalies: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Cache a text-only diagnosis, or attach the anomalies an anomaly-grounded one was based on"""
+        if anomalies is None:
+            self._store_cached_response(embedding, response)
+        else:
+            response["anomalies"] = anomalies
         return response
 
-    def _prepare_context(self, similar_tickets: List[Dict[str, Any]]) -> str:
+    def _prepare_context(self, similar_tickets: List[Dict[str, Any]], anomalies: Optional[Dict[str, Any]] = None) -> str:
         """
-        Prepare context from similar tickets
+        Prepare context from the sensor anomalies, if any, and similar tickets within
+        the configured token budget
         """
-        context = "Similar past issues and their solutions:\n\n"
-        for ticket in similar_tickets:
-            context += f"Issue: {ticket['issue_description']}\n"
-            context += f"Solution: {ticket['resolution_solution']}\n"
-            context += f"Root Cause: {ticket['root_cause']}\n\n"
-        return context
+        anomaly_context = format_anomaly_context(anomalies) + "\n" if anomalies is not None else ""
+        builder = ContextBuilder(
+            max_tokens=settings.CONTEXT_MAX_TOKENS - estimate_tokens(anomaly_context),
+            max_field_tokens=settings.CONTEXT_MAX_FIELD_TOKENS,
+            dedupe_threshold=settings.CONTEXT_DEDUPE_THRESHOLD
+        )
+        context, report = builder.build(similar_tickets)
+        if report["dropped"] or report["truncated"]:
+            logger.debug(
+                f"Context used {report['tokens']}/{report['budget']} tokens; "
+                f"truncated {report['truncated']}, dropped {report['dropped']}"
+            )
+        return anomaly_context + context
 
-    def _generate_response(self, issue_text: str, context: str) -> Dict[str, Any]:
+    def _generate_response(
+        self,
+        issue_text: str,
+        context: str,
+        messages: Optional[List[Dict[str, str]]] = None,
+        attempts: Optional[int] = None,
+        content: str = ""
+    ) -> Dict[str, Any]:
         """
-        Generate response using OpenAI
+        Generate response using OpenAI, retrying a bounded number of times when the
+        output fails validation and falling back to a partial result after that.
+        `messages`, `attempts` and `content` (the last invalid output) continue a
+        conversation whose earlier attempts already used part of the budget.
         """
+        messages = messages or self._build_messages(issue_text, context)
+        attempts = settings.LLM_MAX_RETRIES + 1 if attempts is None else attempts
+        for _ in range(attempts):
+            response = self.client.chat.completions.create(
+                model=settings.LLM_MODEL,
+                messages=messages,
+                tools=[DIAGNOSIS_TOOL],
+                tool_choice=DIAGNOSIS_TOOL_CHOICE
+            )
+            content = self._response_content(response)
+            try:
+                return self._parse_response(content)
+            except ValueError as e:
+                messages = self._retry_messages(messages, content, e)
+        return self._fallback_response(content)
+
+    def _build_messages(self, issue_text: str, context: str) -> List[Dict[str, str]]:
         prompt = f"""
-        You are a field service engineer assistant. Analyze the following issue and provide a solution based on similar past cases.
+        You are a field service engineer assistant. Analyze the following issue and provide a solution based on similar past cases and, when listed, the machine's recent sensor anomalies.
 
         Current Issue:
         {issue_text}
 
         {context}
 
-        Please provide:
+        Call submit_diagnosis with:
         1. A brief summary of the issue
         2. Suggested solution based on similar cases
         3. Confidence score (0-1)
         4. Reference to the most relevant past case
         """
+        return [
+            {"role": "system", "content": "You are a helpful field service engineer assistant."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _response_content(self, response) -> str:
+        message = response.choices[0].message
+        if message.tool_calls:
+            return message.tool_calls[0].function.arguments or ""
+        return message.content or ""
+
+    def _retry_messages(self, messages: List[Dict[str, str]], content: str, error: Exception) -> List[Dict[str, str]]:
+        logger.warning(f"Invalid diagnosis output, retrying: {error}")
+        return messages + [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": f"That output was invalid ({error}). Call submit_diagnosis again with valid arguments."}
+        ]
+
+    def _parse_response(self, content: str) -> Dict[str, Any]:
+        """
+        Validate the model's JSON arguments; raises ValueError when they don't match Diagnosis
+        """
+        diagnosis = Diagnosis.model_validate(json.loads(content))
+        return DiagnosisResponse(**diagnosis.model_dump()).model_dump()
+
+    def _fallback_response(self, content: str) -> Dict[str, Any]:
+        """
+        Salvage whatever fields can be read from invalid output, from JSON-ish
+        "key": value pairs or "Label: value" lines
+        """
+        fields = {}
+        for name in Diagnosis.model_fields:
+            match = re.search(rf'"{name}"\s*:\s*("(?:[^"\\]|\\.)*"|[-\d.]+)', content)
+            if match:
+                try:
+                    fields[name] = json.loads(match.group(1))
+                except ValueError:
+                    pass
+        if not fields:
+            labels = {"summary": "summary", "suggested_fix": "solution", "confidence": "confidence", "source_case": "case"}
+            for line in content.splitlines():
+                label, _, value = line.partition(":")
+                for name, keyword in labels.items():
+                    if keyword in label.lower() and value.strip() and name not in fields:
+                        fields[name] = value.strip()
+        try:
+            confidence = min(max(float(fields.get("confidence", 0.0)), 0.0), 1.0)
+        except (TypeError, ValueError):
+            confidence = 0.0
+        return DiagnosisResponse(
+            summary=str(fields.get("summary", "")),
+            suggested_fix=str(fields.get("suggested_fix", "")),
+            confidence=confidence,
+            source_case=str(fields.get("source_case", "")),
+            partial=True
+        ).model_dump()
+
+class AsyncRAGEngine(RAGEngine):
+    """
+    Async counterpart of RAGEngine: embedding and completion calls use the async
+    OpenAI client and Milvus searches run on a bounded executor, so concurrent
+    requests overlap instead of blocking the event loop.
+    """
+    def __init__(self, milvus_client: Optional[AsyncMilvusClient] = None, embedding_generator: Optional[AsyncEmbeddingGenerator] = None):
+        # Clients passed in are shared with other services and closed by their owner
+        self._owns_milvus_client = milvus_client is None
+        self._owns_embedding_generator = embedding_generator is None
+        self.embedding_generator = embedding_generator or AsyncEmbeddingGenerator()
+        self.milvus_client = milvus_client or AsyncMilvusClient()
+        self.client = AsyncOpenAI()  # This will use the OPENAI_API_KEY environment variable automatically
+        self.semantic_cache = get_semantic_cache()
+        self.anomaly_store = get_anomaly_store()
+        # Filled by load_lexical_index() on a worker thread, never on the event loop
+        self.lexical_index = None
+        self._lexical_index_task: Optional[asyncio.Future] = None
+
+    async def load_lexical_index(self):
+        """
+        Fill the shared lexical index from Milvus on a worker thread. Concurrent callers
+        wait for the same load; after a failure the next call tries again.
+        """
+        if not settings.HYBRID_SEARCH_ENABLED or self.lexical_index is not None:
+            return
+        if self._lexical_index_task is None:
+            self._lexical_index_task = asyncio.ensure_future(
+                asyncio.to_thread(self._load_lexical_index, self.milvus_client.client)
+            )
+        task = self._lexical_index_task
+        try:
+            # Shielded: a cancelled request must not cancel the load other requests wait on
+            self.lexical_index = await asyncio.shield(task)
+        except Exception:
+            if self._lexical_index_task is task and task.done():
+                self._lexical_index_task = None
+            raise
+
+    async def _check_tickets_version(self):
+        # Only hop to a worker thread when a check is due; it queries Milvus and may rebuild the index
+        if (self.lexical_index is None and self.semantic_cache is None) or not get_tickets_version_watcher().due():
+            return
+        await asyncio.to_thread(super()._check_tickets_version, self.milvus_client.client)
+
+    async def process_issue(self, issue_text: str, machine_id: Optional[str] = None, timestamp: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Process a new issue and return relevant solutions, grounded on the machine's
+        recorded sensor anomalies when machine_id is given
+        """
+        await self.load_lexical_index()
+        await self._check_tickets_version()
+        embedding = await self.embedding_generator.generate_embedding(issue_text)
+        anomalies = await self._anomaly_summary(machine_id, timestamp)
+        cached = self._lookup_cached_response(embedding, anomalies)
+        if cached is not None:
+            return cached
+
+        similar_tickets = await self._retrieve(issue_text, embedding, anomalies)
+        context = self._prepare_context(similar_tickets, anomalies)
+        response = await self._generate_response(issue_text, context)
+        return self._finish_response(embedding, response, anomalies)
+
+    async def process_issues(
+        self,
+        issue_texts: List[str],
+        concurrency: Optional[int] = None,
+        machines: Optional[List[Tuple[Optional[str], Optional[datetime]]]] = None
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any], Optional[str]]]:
+        """
+        Diagnose many issues at once, yielding (index, response, error) as each one finishes.
+        All texts are embedded in batched calls and all uncached issues are retrieved with
+        one multi-vector Milvus search; only the completions run per item, at most
+        `concurrency` at a time. `machines` holds each issue's (machine_id, timestamp)
+        for anomaly grounding.
+        """
+        await self.load_lexical_index()
+        await self._check_tickets_version()
+        batch_size = settings.EMBEDDING_BATCH_SIZE
+        embedding_batches = await asyncio.gather(*[
+            self.embedding_generator.generate_embeddings_batch(issue_texts[i:i + batch_size])
+            for i in range(0, len(issue_texts), batch_size)
+        ])
+        embeddings = [embedding for batch in embedding_batches for embedding in batch]
+        if machines:
+            # One worker-thread hop for the whole batch instead of a blocking query per item
+            summarize = super()._anomaly_summary
+            summaries = await asyncio.to_thread(lambda: [summarize(*machine) for machine in machines])
+        else:
+            summaries = [None] * len(issue_texts)
+
+        pending = []
+        for index, embedding in enumerate(embeddings):
+            cached = self._lookup_cached_response(embedding, summaries[index])
+            if cached is not None:
+                yield index, cached, None
+            else:
+                pending.append(index)
+        if not pending:
+            return
+
+        limit = settings.RAG_CANDIDATE_K if any(self._needs_fusion(summaries[i]) for i in pending) else settings.RAG_TOP_K
+        hit_lists = await self.milvus_client.search_similar_tickets_batch([embeddings[i] for i in pending], limit)
+
+        semaphore = asyncio.Semaphore(concurrency or settings.BATCH_LLM_CONCURRENCY)
+
+        async def diagnose(index: int, vector_hits: List[Dict[str, Any]]):
+            async with semaphore:
+                try:
+                    anomalies = summaries[index]
+                    if self._needs_fusion(anomalies):
+                        similar_tickets = self._fuse(issue_texts[index], vector_hits, anomalies)
+                    else:
+                        similar_tickets = vector_hits[:settings.RAG_TOP_K]
+                    context = self._prepare_context(similar_tickets, anomalies)
+                    response = await self._generate_response(issue_texts[index], context)
+                    return index, self._finish_response(embeddings[index], response, anomalies), None
+                except Exception as e:
+                    return index, None, str(e)
+
+        for task in asyncio.as_completed([diagnose(index, hits) for index, hits in zip(pending, hit_lists)]):
+            yield await task
+
+    async def _anomaly_summary(self, machine_id: Optional[str], timestamp: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        # The store runs a blocking SQLite query; keep it off the event loop
+        if self.anomaly_store is None or not machine_id:
+            return None
+        return await asyncio.to_thread(super()._anomaly_summary, machine_id, timestamp)
+
+    async def _retrieve(self, issue_text: str, embedding: List[float], anomalies: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        if not self._needs_fusion(anomalies):
+            return await self.milvus_client.search_similar_tickets(embedding, settings.RAG_TOP_K)
+        vector_hits = await self.milvus_client.search_similar_tickets(embedding, settings.RAG_CANDIDATE_K)
+        return self._fuse(issue_text, vector_hits, anomalies)
+
+    async def _generate_response(
+        self,
+        issue_text: str,
+        context: str,
+        messages: Optional[List[Dict[str, str]]] = None,
+        attempts: Optional[int] = None,
+        content: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Generate response using OpenAI, retrying a bounded number of times when the
+        output fails validation and falling back to a partial result after that.
+        `messages`, `attempts` and `content` (the last invalid output) continue a
+        conversation whose earlier attempts already used part of the budget.
+        """
+        messages = messages or self._build_messages(issue_text, context)
+        attempts = settings.LLM_MAX_RETRIES + 1 if attempts is None else attempts
+        for _ in range(attempts):
+            response = await self.client.chat.completions.create(
+                model=settings.LLM_MODEL,
+                messages=messages,
+                tools=[DIAGNOSIS_TOOL],
+                tool_choice=DIAGNOSIS_TOOL_CHOICE
+            )
+            content = self._response_content(response)
+            try:
+                return self._parse_response(content)
+            except ValueError as e:
+                messages = self._retry_messages(messages, content, e)
+        return self._fallback_response(content)
+
+    async def stream_issue(self, issue_text: str, machine_id: Optional[str] = None, timestamp: Optional[datetime] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Process a new issue incrementally, yielding (event, data) pairs: the sensor
+        anomalies found for the machine, the similar tickets as soon as retrieval
+        finishes, then the diagnosis text as the model writes it ("field" with the
+        name of each STREAMED_FIELDS field as it starts, "token" with its text), and
+        finally the parsed result. The streamed completion counts as the first of
+        the LLM_MAX_RETRIES + 1 attempts.
+        """
+        await self.load_lexical_index()
+        await self._check_tickets_version()
+        embedding = await self.embedding_generator.generate_embedding(issue_text)
+        anomalies = await self._anomaly_summary(machine_id, timestamp)
+        cached = self._lookup_cached_response(embedding, anomalies)
+        if cached is not None:
+            yield "result", cached
+            return
 
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful field service engineer assistant."},
-                {"role": "user", "content": prompt}
-            ]
+        if anomalies is not None:
+            yield "anomalies", anomalies
+        similar_tickets = await self._retrieve(issue_text, embedding, anomalies)
+        yield "tickets", similar_tickets
+
+        context = self._prepare_context(similar_tickets, anomalies)
+        messages = self._build_messages(issue_text, context)
+        stream = await self.client.chat.completions.create(
+            model=settings.LLM_MODEL,
+            messages=messages,
+            tools=[DIAGNOSIS_TOOL],
+            tool_choice=DIAGNOSIS_TOOL_CHOICE,
+            stream=True
         )
+        chunks = []
+        fields = StreamedFieldText(STREAMED_FIELDS)
+        current_field = None
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.tool_calls:
+                fragment = delta.tool_calls[0].function.arguments
+                if fragment:
+                    chunks.append(fragment)
+                    for field, text in fields.feed(fragment):
+                        if field != current_field:
+                            current_field = field
+                            yield "field", field
+                        yield "token", text
+            elif delta.content:
+                # Plain text answer instead of a tool call: already prose
+                chunks.append(delta.content)
+                yield "token", delta.content
 
-        # Parse the response
-        content = response.choices[0].message.content
-        lines = content.split('\n')
-        
-        return {
-            "summary": lines[0].split(': ')[1] if len(lines) > 0 else "",
-            "suggested_fix": lines[1].split(': ')[1] if len(lines) > 1 else "",
-            "confidence": float(lines[2].split(': ')[1]) if len(lines) > 2 else 0.0,
-            "source_case": lines[3].split(': ')[1] if len(lines) > 3 else ""
-        } 
\ No newline at end of file
+        content = "".join(chunks)
+        try:
+            response = self._parse_response(content)
+        except ValueError as e:
+            # The streamed completion was the first attempt; retries get what is left of the budget
+            response = await self._generate_response(
+                issue_text, context,
+                messages=self._retry_messages(messages, content, e),
+                attempts=settings.LLM_MAX_RETRIES,
+                content=content
+            )
+        yield "result", self._finish_response(embedding, response, anomalies)
+
+    async def close(self):
+        await self.client.close()
+        if self._owns_embedding_generator:
+            await self.embedding_generator.close()
+        if self._owns_milvus_client:
+            await self.milvus_client.close()
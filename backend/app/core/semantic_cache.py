@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+class SemanticCache:
+    """
+    Cache of answered issues looked up by embedding similarity instead of exact text.
+    A query whose cosine similarity to a stored issue is at least `threshold` returns
+    that issue's diagnosis. Entries expire after `ttl_seconds` and the least recently
+    used entry is evicted once `max_entries` is reached.
+    """
+    def __init__(self, threshold: float = 0.97, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        self._valid = np.zeros(max_entries, dtype=bool)
+        # slot -> (response, stored_at), kept in least-recently-used first order
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached response of the most similar live entry, or None
+        """
+        with self._lock:
+            if not self._entries or self._vectors is None:
+                return None
+            query = self._normalize(embedding)
+            similarities = self._vectors @ query
+            similarities[~self._valid] = -np.inf
+            now = time.time()
+            while True:
+                slot = int(np.argmax(similarities))
+                if similarities[slot] < self.threshold:
+                    return None
+                response, stored_at = self._entries[slot]
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(slot)
+                    return response
+                self._free(slot)
+                similarities[slot] = -np.inf
+
+    def store(self, embedding: List[float], response: Dict[str, Any]):
+        with self._lock:
+            vector = self._normalize(embedding)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if not self._free_slots:
+                self._free(next(iter(self._entries)))
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._valid[slot] = True
+            self._entries[slot] = (response, time.time())
+
+    def invalidate(self):
+        """
+        Drop every entry, e.g. after the tickets collection changes
+        """
+        with self._lock:
+            for slot in list(self._entries):
+                self._free(slot)
+
+    def _free(self, slot: int):
+        del self._entries[slot]
+        self._valid[slot] = False
+        self._free_slots.append(slot)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+@lru_cache()
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Process-wide semantic answer cache configured from settings, or None when disabled.
+    It is cleared whenever tickets are written or deleted through MilvusClient, and
+    when the tickets version checked before each lookup shows writes by another process.
+    """
+    from app.config import get_settings
+    from app.database.milvus import on_tickets_changed, on_tickets_deleted, on_tickets_reloaded
+    settings = get_settings()
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    cache = SemanticCache(
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES
+    )
+    on_tickets_changed(lambda tickets: cache.invalidate())
+    on_tickets_deleted(lambda ids: cache.invalidate())
+    on_tickets_reloaded(lambda client: cache.invalidate())
+    return cache
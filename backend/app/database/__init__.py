@@ -1,3 +1,3 @@
-from app.database import milvus, models
+from app.database import connections, indexes, milvus, models
 
-__all__ = ["milvus", "models"] 
\ No newline at end of file
+__all__ = ["connections", "indexes", "milvus", "models"] 
\ No newline at end of file
@@ -0,0 +1,121 @@
+from pymilvus import connections
+from pymilvus.exceptions import MilvusUnavailableException
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+from loguru import logger
+from app.config import get_settings
+import os
+import threading
+import time
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+class MilvusConnectionManager:
+    """
+    Shares Milvus connections between MilvusClient instances. Each worker process gets
+    its own alias (gRPC channels must not cross a fork); inside a process every client
+    reuses that alias, which is reference counted so one client closing does not
+    disconnect the others. Connections use gRPC keepalive and reconnect with
+    exponential backoff, and a per-alias semaphore caps in-flight searches.
+    """
+    def __init__(
+        self,
+        max_inflight_searches: int = 16,
+        connect_retries: int = 5,
+        backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 10.0
+    ):
+        self.max_inflight_searches = max_inflight_searches
+        self.connect_retries = connect_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._lock = threading.Lock()
+        self._refcounts: Dict[str, int] = {}
+        self._search_slots: Dict[str, threading.BoundedSemaphore] = {}
+
+    def worker_alias(self) -> str:
+        return f"diengg-{os.getpid()}"
+
+    def acquire(self, alias: Optional[str] = None) -> str:
+        """
+        Return a connected alias (the worker's by default), connecting on first use
+        """
+        alias = alias or self.worker_alias()
+        with self._lock:
+            if not self._refcounts.get(alias) or not connections.has_connection(alias):
+                self._connect(alias)
+            self._refcounts[alias] = self._refcounts.get(alias, 0) + 1
+            self._search_slots.setdefault(alias, threading.BoundedSemaphore(self.max_inflight_searches))
+        return alias
+
+    def release(self, alias: str):
+        """
+        Drop one reference to an alias, disconnecting once nobody uses it
+        """
+        with self._lock:
+            count = self._refcounts.get(alias, 0) - 1
+            if count > 0:
+                self._refcounts[alias] = count
+                return
+            self._refcounts.pop(alias, None)
+            self._search_slots.pop(alias, None)
+            connections.disconnect(alias)
+
+    def reconnect(self, alias: str):
+        with self._lock:
+            connections.disconnect(alias)
+            self._connect(alias)
+
+    def _connect(self, alias: str):
+        delay = self.backoff_seconds
+        for attempt in range(self.connect_retries + 1):
+            try:
+                connections.connect(
+                    alias=alias,
+                    host=settings.MILVUS_HOST,
+                    port=settings.MILVUS_PORT,
+                    user=settings.MILVUS_USER,
+                    password=settings.MILVUS_PASSWORD,
+                    keep_alive=True
+                )
+                return
+            except Exception as e:
+                if attempt == self.connect_retries:
+                    raise
+                logger.warning(f"Milvus connection '{alias}' failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff_seconds)
+
+    @contextmanager
+    def search_slot(self, alias: str) -> Iterator[None]:
+        """
+        Block until fewer than max_inflight_searches searches are running on this alias
+        """
+        slot = self._search_slots.get(alias)
+        if slot is None:
+            yield
+            return
+        with slot:
+            yield
+
+    def call(self, alias: str, func: Callable[[], T]) -> T:
+        """
+        Run a Milvus call, reconnecting once if the server was unreachable
+        """
+        try:
+            return func()
+        except MilvusUnavailableException as e:
+            logger.warning(f"Milvus connection '{alias}' unavailable ({e}), reconnecting")
+            self.reconnect(alias)
+            return func()
+
+@lru_cache()
+def get_connection_manager() -> MilvusConnectionManager:
+    return MilvusConnectionManager(
+        max_inflight_searches=settings.MILVUS_MAX_INFLIGHT_SEARCHES,
+        connect_retries=settings.MILVUS_CONNECT_RETRIES,
+        backoff_seconds=settings.MILVUS_RECONNECT_BACKOFF_SECONDS
+    )
@@ -0,0 +1,60 @@
+from typing import Dict, Any, Optional
+from app.config import get_settings
+
+settings = get_settings()
+
+# Vector index profiles. Each one pairs build parameters with matching search parameters.
+INDEX_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Original setup: exact-ish recall, fine up to a few hundred thousand vectors
+    "ivf_flat": {
+        "index_type": "IVF_FLAT",
+        "params": {"nlist": 128},
+        "search_params": {"nprobe": 10}
+    },
+    # Small corpora that fit comfortably in memory: best latency/recall trade-off
+    "small": {
+        "index_type": "HNSW",
+        "params": {"M": 16, "efConstruction": 200},
+        "search_params": {"ef": 64}
+    },
+    # Large corpora: product quantization keeps memory per vector small (1536 dims / m=64)
+    "large": {
+        "index_type": "IVF_PQ",
+        "params": {"nlist": 4096, "m": 64, "nbits": 8},
+        "search_params": {"nprobe": 32}
+    },
+    # Memory-constrained deployments: graph index served from local disk
+    "memory_constrained": {
+        "index_type": "DISKANN",
+        "params": {},
+        "search_params": {"search_list": 100}
+    }
+}
+
+def _resolve_profile(profile: Optional[str]) -> Dict[str, Any]:
+    name = profile or settings.MILVUS_INDEX_PROFILE
+    if name not in INDEX_PROFILES:
+        raise ValueError(f"Unknown index profile '{name}'. Available: {', '.join(INDEX_PROFILES)}")
+    return INDEX_PROFILES[name]
+
+def get_index_params(profile: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Index build parameters for a profile (defaults to MILVUS_INDEX_PROFILE), with any
+    MILVUS_INDEX_TYPE / MILVUS_INDEX_PARAMS overrides applied
+    """
+    resolved = _resolve_profile(profile)
+    return {
+        "metric_type": settings.MILVUS_METRIC_TYPE,
+        "index_type": settings.MILVUS_INDEX_TYPE or resolved["index_type"],
+        "params": settings.MILVUS_INDEX_PARAMS if settings.MILVUS_INDEX_PARAMS is not None else resolved["params"]
+    }
+
+def get_search_params(profile: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Search parameters for a profile, with any MILVUS_SEARCH_PARAMS override applied
+    """
+    resolved = _resolve_profile(profile)
+    return {
+        "metric_type": settings.MILVUS_METRIC_TYPE,
+        "params": settings.MILVUS_SEARCH_PARAMS if settings.MILVUS_SEARCH_PARAMS is not None else resolved["search_params"]
+    }
@@ -1,44 +1,190 @@
 from pymilvus import connections, Collection, utility
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple, Union, Iterator
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from app.config import get_settings
+from app.database.connections import get_connection_manager
+from app.database.indexes import get_index_params, get_search_params
+import asyncio
+import functools
 import json
+import threading
+import time
 
 settings = get_settings()
 
+TICKET_OUTPUT_FIELDS = ["id", "ticket_id", "machine_model", "serial_number", "issue_description",
+                        "affected_components", "customer", "reported_date", "priority", "status",
+                        "resolution_solution", "root_cause", "resolution_date", "technician"]
+
+_tickets_change_listeners = []
+
+def on_tickets_changed(callback):
+    """
+    Register a callback to run whenever tickets are written through any MilvusClient.
+    It receives the list of written ticket dicts.
+    """
+    _tickets_change_listeners.append(callback)
+
+def _notify_tickets_changed(tickets: List[Dict[str, Any]]):
+    for callback in _tickets_change_listeners:
+        callback(tickets)
+
+TEAM_MEMBER_OUTPUT_FIELDS = ["id", "employee_id", "name", "role", "skills", "certifications",
+                             "resolved_issues", "experience_years", "region"]
+
+OUTPUT_FIELDS = {"tickets": TICKET_OUTPUT_FIELDS, "team_knowledge": TEAM_MEMBER_OUTPUT_FIELDS}
+
+# Fields stored as JSON strings because Milvus VARCHAR cannot hold lists
+JSON_FIELDS = {"tickets": ["affected_components"], "team_knowledge": ["skills", "certifications", "resolved_issues"]}
+
+_tickets_delete_listeners = []
+
+def on_tickets_deleted(callback):
+    """
+    Register a callback to run whenever tickets are deleted through any MilvusClient.
+    It receives the list of deleted primary keys.
+    """
+    _tickets_delete_listeners.append(callback)
+
+def _notify_tickets_deleted(ids: List[str]):
+    for callback in _tickets_delete_listeners:
+        callback(ids)
+
+_tickets_reload_listeners = []
+
+def on_tickets_reloaded(callback):
+    """
+    Register a callback to run when the tickets collection changed outside this
+    process (ingest.py, upload_data.py, another API worker), which the change and
+    delete listeners never see. It receives a MilvusClient to re-read the tickets with.
+    """
+    _tickets_reload_listeners.append(callback)
+
+class TicketsVersionWatcher:
+    """
+    Notices writes to the tickets collection from any process. check() reads the
+    collection's version (see MilvusClient.tickets_version) at most once every
+    `interval` seconds and runs the reload listeners when it moved since the last
+    check. Writes made in this process move it as well, so they cost one redundant
+    reload; a reload that fails is retried by the next check.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._version: Optional[Tuple[int, int]] = None
+        self._checked_at: Optional[float] = None
+
+    def due(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.interval
+
+    def check(self, client: "MilvusClient") -> bool:
+        """Compare the collection's version with the last one seen; returns whether listeners ran"""
+        # Callers arriving while another thread checks go on with what is loaded
+        if not self.due() or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if not self.due():
+                return False
+            version = client.tickets_version()
+            changed = self._version is not None and version != self._version
+            if changed:
+                for callback in _tickets_reload_listeners:
+                    callback(client)
+            self._version = version
+            self._checked_at = time.monotonic()
+            return changed
+        finally:
+            self._lock.release()
+
+@functools.lru_cache()
+def get_tickets_version_watcher() -> TicketsVersionWatcher:
+    return TicketsVersionWatcher(settings.TICKETS_VERSION_CHECK_SECONDS)
+
+# Scalar fields of the tickets collection that searches and deletes filter on
+TICKET_SCALAR_INDEX_FIELDS = ["ticket_id", "machine_model", "serial_number", "priority", "status", "reported_date"]
+
+def _in_or_equals(field: str, value: Union[str, List[str]]) -> str:
+    if isinstance(value, (list, tuple, set)):
+        return f"{field} in {json.dumps(list(value))}"
+    return f"{field} == {json.dumps(value)}"
+
+def build_ticket_filter(
+    machine_model: Optional[Union[str, List[str]]] = None,
+    serial_number: Optional[str] = None,
+    priority: Optional[Union[str, List[str]]] = None,
+    status: Optional[Union[str, List[str]]] = None,
+    reported_after: Optional[Union[datetime, str]] = None,
+    reported_before: Optional[Union[datetime, str]] = None
+) -> str:
+    """
+    Build a Milvus boolean expression over ticket metadata. reported_date is stored as an
+    ISO-8601 string, so range comparisons on it are lexicographic and order correctly.
+    """
+    clauses = []
+    if machine_model:
+        clauses.append(_in_or_equals("machine_model", machine_model))
+    if serial_number:
+        clauses.append(_in_or_equals("serial_number", serial_number))
+    if priority:
+        clauses.append(_in_or_equals("priority", priority))
+    if status:
+        clauses.append(_in_or_equals("status", status))
+    if reported_after:
+        value = reported_after.isoformat() if isinstance(reported_after, datetime) else reported_after
+        clauses.append(f"reported_date >= {json.dumps(value)}")
+    if reported_before:
+        value = reported_before.isoformat() if isinstance(reported_before, datetime) else reported_before
+        clauses.append(f"reported_date <= {json.dumps(value)}")
+    return " and ".join(clauses)
+
+def _ticket_hits_to_dicts(hits) -> List[Dict[str, Any]]:
+    """Convert one query's search hits into plain ticket dicts with their distance"""
+    tickets = []
+    for hit in hits:
+        ticket = {field: hit.entity.get(field) for field in TICKET_OUTPUT_FIELDS}
+        if ticket.get("affected_components"):
+            ticket["affected_components"] = json.loads(ticket["affected_components"])
+        ticket["distance"] = hit.distance
+        tickets.append(ticket)
+    return tickets
+
 class MilvusClient:
-    def __init__(self):
-        self.connect()
+    def __init__(self, alias: Optional[str] = None):
+        self.connection_manager = get_connection_manager()
+        self.alias = None
+        self.connect(alias)
         self.tickets_collection = None
         self.team_knowledge_collection = None
+        # collection name -> None when fully loaded, or the set of loaded partition names
+        self._load_state: Dict[str, Optional[Set[str]]] = {}
         self._setup_collections()
         self._ensure_indexes()
 
-    def connect(self):
-        connections.connect(
-            alias="default",
-            host=settings.MILVUS_HOST,
-            port=settings.MILVUS_PORT,
-            user=settings.MILVUS_USER,
-            password=settings.MILVUS_PASSWORD
-        )
+    def connect(self, alias: Optional[str] = None):
+        """
+        Attach to a pooled connection: the worker's shared alias unless one is given
+        """
+        self.alias = self.connection_manager.acquire(alias)
 
     def _setup_collections(self):
         # Setup tickets collection
-        if not utility.has_collection("tickets"):
+        if not utility.has_collection("tickets", using=self.alias):
             self._create_tickets_collection()
-        self.tickets_collection = Collection("tickets")
+        self.tickets_collection = Collection("tickets", using=self.alias)
 
         # Setup team knowledge collection
-        if not utility.has_collection("team_knowledge"):
+        if not utility.has_collection("team_knowledge", using=self.alias):
             self._create_team_knowledge_collection()
-        self.team_knowledge_collection = Collection("team_knowledge")
+        self.team_knowledge_collection = Collection("team_knowledge", using=self.alias)
 
     def _create_tickets_collection(self):
         from pymilvus import CollectionSchema, FieldSchema, DataType
         fields = [
             FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, max_length=100),
             FieldSchema(name="ticket_id", dtype=DataType.VARCHAR, max_length=100),
-            FieldSchema(name="machine_model", dtype=DataType.VARCHAR, max_length=100),
+            # Partition key: filters on machine_model only scan that model's partition
+            FieldSchema(name="machine_model", dtype=DataType.VARCHAR, max_length=100, is_partition_key=True),
             FieldSchema(name="serial_number", dtype=DataType.VARCHAR, max_length=100),
             FieldSchema(name="issue_description", dtype=DataType.VARCHAR, max_length=1000),
             FieldSchema(name="affected_components", dtype=DataType.VARCHAR, max_length=2000),
@@ -50,18 +196,17 @@ class MilvusClient:
             FieldSchema(name="root_cause", dtype=DataType.VARCHAR, max_length=1000),
             FieldSchema(name="resolution_date", dtype=DataType.VARCHAR, max_length=100),
             FieldSchema(name="technician", dtype=DataType.VARCHAR, max_length=100),
-            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=1536)
+            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=1536),
+            # SHA-256 of the stored content, used by bulk ingestion to skip duplicates
+            FieldSchema(name="content_hash", dtype=DataType.VARCHAR, max_length=64)
         ]
         schema = CollectionSchema(fields=fields, description="Tickets collection")
-        collection = Collection(name="tickets", schema=schema)
+        collection = Collection(name="tickets", schema=schema, using=self.alias)
         
         # Create index on the embedding field
-        index_params = {
-            "metric_type": "L2",
-            "index_type": "IVF_FLAT",
-            "params": {"nlist": 128}
-        }
+        index_params = get_index_params()
         collection.create_index(field_name="embedding", index_params=index_params)
+        self._ensure_scalar_indexes(collection, TICKET_SCALAR_INDEX_FIELDS)
 
     def _create_team_knowledge_collection(self):
         from pymilvus import CollectionSchema, FieldSchema, DataType
@@ -75,110 +220,414 @@ class MilvusClient:
             FieldSchema(name="resolved_issues", dtype=DataType.VARCHAR, max_length=2000),
             FieldSchema(name="experience_years", dtype=DataType.INT64),
             FieldSchema(name="region", dtype=DataType.VARCHAR, max_length=100),
-            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=1536)
+            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=1536),
+            FieldSchema(name="content_hash", dtype=DataType.VARCHAR, max_length=64)
         ]
         schema = CollectionSchema(fields=fields, description="Team knowledge collection")
-        collection = Collection(name="team_knowledge", schema=schema)
+        collection = Collection(name="team_knowledge", schema=schema, using=self.alias)
         
         # Create index on the embedding field
-        index_params = {
-            "metric_type": "L2",
-            "index_type": "IVF_FLAT",
-            "params": {"nlist": 128}
-        }
+        index_params = get_index_params()
         collection.create_index(field_name="embedding", index_params=index_params)
 
     def _ensure_indexes(self):
         """Ensure all collections have proper indexes"""
         # Ensure tickets collection index
         if self.tickets_collection:
-            if not self.tickets_collection.has_index():
-                index_params = {
-                    "metric_type": "L2",
-                    "index_type": "IVF_FLAT",
-                    "params": {"nlist": 128}
-                }
+            if not self._has_vector_index(self.tickets_collection):
+                index_params = get_index_params()
                 self.tickets_collection.create_index(field_name="embedding", index_params=index_params)
-            self.tickets_collection.load()
+            self._ensure_scalar_indexes(self.tickets_collection, TICKET_SCALAR_INDEX_FIELDS + self._hash_fields(self.tickets_collection))
+            self.load_collection(self.tickets_collection)
 
         # Ensure team knowledge collection index
         if self.team_knowledge_collection:
-            if not self.team_knowledge_collection.has_index():
-                index_params = {
-                    "metric_type": "L2",
-                    "index_type": "IVF_FLAT",
-                    "params": {"nlist": 128}
-                }
+            if not self._has_vector_index(self.team_knowledge_collection):
+                index_params = get_index_params()
                 self.team_knowledge_collection.create_index(field_name="embedding", index_params=index_params)
-            self.team_knowledge_collection.load()
+            self._ensure_scalar_indexes(self.team_knowledge_collection, self._hash_fields(self.team_knowledge_collection))
+            self.load_collection(self.team_knowledge_collection)
+
+    def _has_vector_index(self, collection: Collection) -> bool:
+        # has_index() without a name is ambiguous once scalar indexes exist, so check by field
+        return any(index.field_name == "embedding" for index in collection.indexes)
+
+    def _hash_fields(self, collection: Collection) -> List[str]:
+        # Collections created before content hashes were added do not have the field
+        return ["content_hash"] if self._collection_has_field(collection, "content_hash") else []
+
+    def _collection_has_field(self, collection: Collection, field_name: str) -> bool:
+        return any(field.name == field_name for field in collection.schema.fields)
+
+    def _collection(self, name: str) -> Collection:
+        if name == "tickets":
+            return self.tickets_collection
+        if name == "team_knowledge":
+            return self.team_knowledge_collection
+        raise ValueError(f"Unknown collection '{name}'")
+
+    def fetch_records(self, collection_name: str, ids: List[str], with_embedding: bool = False, batch_size: int = 1000) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up stored records by primary key, returning {id: record} for those that
+        exist. JSON-encoded list fields are decoded; content_hash is included when
+        the collection has it.
+        """
+        collection = self._collection(collection_name)
+        self._ensure_loaded(collection)
+        output_fields = list(OUTPUT_FIELDS[collection_name]) + self._hash_fields(collection)
+        if with_embedding:
+            output_fields.append("embedding")
+        found: Dict[str, Dict[str, Any]] = {}
+        ids = list(dict.fromkeys(ids))
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            rows = self.connection_manager.call(self.alias, lambda: collection.query(
+                expr=_in_or_equals("id", chunk),
+                output_fields=output_fields,
+                limit=len(chunk)
+            ))
+            for row in rows:
+                for field in JSON_FIELDS[collection_name]:
+                    if row.get(field):
+                        row[field] = json.loads(row[field])
+                found[row["id"]] = row
+        return found
+
+    def _ensure_scalar_indexes(self, collection: Collection, field_names: List[str]):
+        """Create inverted indexes on scalar fields used in search filters"""
+        indexed = {index.field_name for index in collection.indexes}
+        missing = [field for field in field_names if field not in indexed]
+        if not missing:
+            return
+        # Indexes can only be added to a released collection
+        was_loaded = utility.load_state(collection.name, using=self.alias).name == "Loaded"
+        if was_loaded:
+            collection.release()
+        for field in missing:
+            collection.create_index(field_name=field, index_params={"index_type": "INVERTED"}, index_name=f"{field}_idx")
+        if was_loaded:
+            collection.load()
+
+    def load_collection(self, collection: Collection, partition_names: Optional[List[str]] = None):
+        """
+        Load a collection (or only some of its partitions) into query nodes, skipping
+        anything this client has already loaded
+        """
+        name = collection.name
+        loaded = self._load_state.get(name, set())
+        if name in self._load_state and loaded is None:
+            return
+        if partition_names is None:
+            collection.load()
+            self._load_state[name] = None
+            return
+        missing = [p for p in partition_names if p not in loaded]
+        if missing:
+            collection.load(partition_names=missing)
+            self._load_state[name] = loaded | set(missing)
+
+    def release_collection(self, collection: Collection, partition_names: Optional[List[str]] = None):
+        """
+        Release a collection (or some of its partitions) from memory
+        """
+        name = collection.name
+        if partition_names is None:
+            collection.release()
+            self._load_state.pop(name, None)
+            return
+        for partition_name in partition_names:
+            collection.partition(partition_name).release()
+        loaded = self._load_state.get(name)
+        if loaded is not None:
+            loaded.difference_update(partition_names)
+            if not loaded:
+                self._load_state.pop(name, None)
+        else:
+            # Part of a fully loaded collection was released, so server state is the source of truth again
+            self._load_state.pop(name, None)
+
+    def _ensure_loaded(self, collection: Collection, partition_names: Optional[List[str]] = None):
+        name = collection.name
+        if name in self._load_state:
+            loaded = self._load_state[name]
+            if loaded is None or (partition_names and loaded.issuperset(partition_names)):
+                return
+        self.load_collection(collection, partition_names)
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Report connection and per-collection load state. The client is ready when it is
+        connected and every collection is fully loaded on the server.
+        """
+        status = {"connected": False, "ready": False, "collections": {}}
+        try:
+            status["connected"] = connections.has_connection(self.alias)
+            ready = status["connected"]
+            for collection in (self.tickets_collection, self.team_knowledge_collection):
+                if collection is None:
+                    ready = False
+                    continue
+                state = utility.load_state(collection.name, using=self.alias)
+                status["collections"][collection.name] = state.name
+                if state.name != "Loaded":
+                    ready = False
+                    # Forget stale local state so the next search reloads the collection
+                    self._load_state.pop(collection.name, None)
+            status["ready"] = ready
+        except Exception as e:
+            status["error"] = str(e)
+        return status
+
+    def _ticket_columns(self, tickets: List[Dict[str, Any]], embeddings: List[List[float]]) -> List[List[Any]]:
+        """Build column arrays in tickets schema order"""
+        return [
+            [t["id"] for t in tickets],
+            [t["ticket_id"] for t in tickets],
+            [t["machine_model"] for t in tickets],
+            [t["serial_number"] for t in tickets],
+            [t["issue_description"] for t in tickets],
+            [json.dumps(t["affected_components"]) for t in tickets],
+            [t["customer"] for t in tickets],
+            [t["reported_date"].isoformat() for t in tickets],
+            [t["priority"] for t in tickets],
+            [t["status"] for t in tickets],
+            [t.get("resolution_solution", "") for t in tickets],
+            [t.get("root_cause", "") for t in tickets],
+            [t.get("resolution_date", "").isoformat() if t.get("resolution_date") else "" for t in tickets],
+            [t.get("technician", "") for t in tickets],
+            list(embeddings)
+        ] + self._hash_column(self.tickets_collection, tickets)
+
+    def _hash_column(self, collection: Collection, records: List[Dict[str, Any]]) -> List[List[str]]:
+        if not self._collection_has_field(collection, "content_hash"):
+            return []
+        return [[r.get("content_hash", "") for r in records]]
+
+    def _bulk_insert(self, collection: Collection, columns: List[List[Any]], batch_size: int = None, upsert: bool = False) -> int:
+        """Insert (or upsert) column arrays in chunks of batch_size rows, then flush once"""
+        batch_size = batch_size or settings.MILVUS_INSERT_BATCH_SIZE
+        total = len(columns[0])
+        write = collection.upsert if upsert else collection.insert
+        for start in range(0, total, batch_size):
+            write([column[start:start + batch_size] for column in columns])
+        if total:
+            collection.flush()
+        return total
+
+    def rebuild_index(self, name: str, profile: Optional[str] = None, batch_size: int = 1000, drop_old: bool = True) -> str:
+        """
+        Rebuild a collection's vector index with another profile while searches keep running.
+        A new physical collection is created with the new index, backfilled from the live one
+        and loaded; the logical name is then pointed at it through a Milvus alias. The first
+        rebuild of a plain collection renames it out of the way before the alias is created,
+        which leaves a window of a few milliseconds; later rebuilds switch atomically.
+        Writes made during the copy are not carried over, so pause ingestion while it runs.
+        Returns the name of the new physical collection.
+        """
+        source = Collection(name, using=self.alias)
+        physical_name = source.describe().get("collection_name", name)
+        target_name = f"{name}_{int(time.time())}"
+
+        target = Collection(name=target_name, schema=source.schema, using=self.alias)
+        target.create_index(field_name="embedding", index_params=get_index_params(profile))
+        if name == "tickets":
+            self._ensure_scalar_indexes(target, TICKET_SCALAR_INDEX_FIELDS)
+
+        self._ensure_loaded(source)
+        iterator = source.query_iterator(
+            batch_size=batch_size,
+            output_fields=[field.name for field in source.schema.fields]
+        )
+        while True:
+            rows = iterator.next()
+            if not rows:
+                iterator.close()
+                break
+            target.insert(rows)
+        target.flush()
+        target.load()
+
+        if physical_name != name:
+            utility.alter_alias(collection_name=target_name, alias=name, using=self.alias)
+        else:
+            physical_name = f"{name}_legacy_{int(time.time())}"
+            utility.rename_collection(name, physical_name, using=self.alias)
+            utility.create_alias(collection_name=target_name, alias=name, using=self.alias)
+
+        if drop_old:
+            utility.drop_collection(physical_name, using=self.alias)
+
+        self._load_state[name] = None
+        if name == "tickets":
+            self.tickets_collection = Collection(name, using=self.alias)
+        elif name == "team_knowledge":
+            self.team_knowledge_collection = Collection(name, using=self.alias)
+        return target_name
 
     def insert_ticket(self, ticket_data: Dict[str, Any], embedding: List[float]):
-        self.tickets_collection.insert([
-            [ticket_data["id"]],
-            [ticket_data["ticket_id"]],
-            [ticket_data["machine_model"]],
-            [ticket_data["serial_number"]],
-            [ticket_data["issue_description"]],
-            [json.dumps(ticket_data["affected_components"])],
-            [ticket_data["customer"]],
-            [ticket_data["reported_date"].isoformat()],
-            [ticket_data["priority"]],
-            [ticket_data["status"]],
-            [ticket_data.get("resolution_solution", "")],
-            [ticket_data.get("root_cause", "")],
-            [ticket_data.get("resolution_date", "").isoformat() if ticket_data.get("resolution_date") else ""],
-            [ticket_data.get("technician", "")],
-            [embedding]
-        ])
-
-    def search_similar_tickets(self, embedding: List[float], limit: int = 5):
+        self.tickets_collection.insert(self._ticket_columns([ticket_data], [embedding]))
+        _notify_tickets_changed([ticket_data])
+
+    def insert_tickets(self, tickets: List[Dict[str, Any]], embeddings: List[List[float]], batch_size: int = None) -> int:
+        """
+        Bulk insert tickets with their embeddings, sending chunked column inserts and a single flush
+        """
+        if len(tickets) != len(embeddings):
+            raise ValueError("tickets and embeddings must have the same length")
+        inserted = self._bulk_insert(self.tickets_collection, self._ticket_columns(tickets, embeddings), batch_size)
+        _notify_tickets_changed(tickets)
+        return inserted
+
+    def upsert_tickets(self, tickets: List[Dict[str, Any]], embeddings: List[List[float]], batch_size: int = None) -> int:
+        """
+        Insert or replace tickets keyed by ticket_id (used as the primary key). Copies of
+        the same tickets stored under other primary keys, e.g. random ids from older
+        uploads, are deleted so every ticket_id keeps exactly one vector.
+        """
+        if len(tickets) != len(embeddings):
+            raise ValueError("tickets and embeddings must have the same length")
+        for ticket in tickets:
+            ticket["id"] = ticket["ticket_id"]
+        stale_ids = [
+            row["id"] for row in self._query_ticket_ids([t["ticket_id"] for t in tickets])
+            if row["id"] != row["ticket_id"]
+        ]
+        if stale_ids:
+            self._delete_ticket_ids(stale_ids)
+        written = self._bulk_insert(self.tickets_collection, self._ticket_columns(tickets, embeddings), batch_size, upsert=True)
+        _notify_tickets_changed(tickets)
+        return written
+
+    def delete_tickets(self, ticket_ids: List[str]) -> int:
+        """
+        Delete every stored copy of the given tickets; returns how many rows were removed
+        """
+        ids = [row["id"] for row in self._query_ticket_ids(ticket_ids)]
+        if ids:
+            self._delete_ticket_ids(ids)
+            self.tickets_collection.flush()
+        return len(ids)
+
+    def _query_ticket_ids(self, ticket_ids: List[str]) -> List[Dict[str, Any]]:
+        if not ticket_ids:
+            return []
+        self._ensure_loaded(self.tickets_collection)
+        ticket_ids = list(dict.fromkeys(ticket_ids))
+        return self.connection_manager.call(self.alias, lambda: self.tickets_collection.query(
+            expr=_in_or_equals("ticket_id", ticket_ids),
+            output_fields=["id", "ticket_id"]
+        ))
+
+    def _delete_ticket_ids(self, ids: List[str]):
+        self.tickets_collection.delete(expr=_in_or_equals("id", ids))
+        _notify_tickets_deleted(ids)
+
+    def search_similar_tickets(self, embedding: List[float], limit: int = 5, **filters) -> List[Dict[str, Any]]:
+        """
+        Vector search over tickets, optionally restricted by metadata filters
+        (see build_ticket_filter for the accepted keyword arguments)
+        """
+        return self.search_similar_tickets_batch([embedding], limit, **filters)[0]
+
+    def search_similar_tickets_batch(self, embeddings: List[List[float]], limit: int = 5, **filters) -> List[List[Dict[str, Any]]]:
+        """
+        Multi-vector search over tickets in a single request; returns one hit list per embedding
+        """
         if not self.tickets_collection:
             raise Exception("Tickets collection not initialized")
+        if not embeddings:
+            return []
             
-        self.tickets_collection.load()
-        search_params = {
-            "metric_type": "L2",
-            "params": {"nprobe": 10}
-        }
-        results = self.tickets_collection.search(
-            data=[embedding],
-            anns_field="embedding",
-            param=search_params,
-            limit=limit,
-            output_fields=["id", "ticket_id", "machine_model", "serial_number", "issue_description", 
-                         "affected_components", "customer", "reported_date", "priority", "status",
-                         "resolution_solution", "root_cause", "resolution_date", "technician"]
-        )
-        return results
+        self._ensure_loaded(self.tickets_collection)
+        search_params = get_search_params()
+        with self.connection_manager.search_slot(self.alias):
+            results = self.connection_manager.call(self.alias, lambda: self.tickets_collection.search(
+                data=embeddings,
+                anns_field="embedding",
+                param=search_params,
+                limit=limit,
+                expr=build_ticket_filter(**filters) or None,
+                output_fields=TICKET_OUTPUT_FIELDS
+            ))
+        return [_ticket_hits_to_dicts(hits) for hits in results]
+
+    def tickets_version(self) -> Tuple[int, int]:
+        """
+        Cheap marker of the tickets collection's contents: the live row count, which
+        every insert and delete changes, and the flushed row count, which also grows on
+        every upsert because replaced rows are only dropped at compaction. Every write
+        through MilvusClient flushes, so writes from other processes move it too.
+        """
+        collection = self.tickets_collection
+        self._ensure_loaded(collection)
+        rows = self.connection_manager.call(self.alias, lambda: collection.query(
+            expr="",
+            output_fields=["count(*)"],
+            consistency_level="Strong"
+        ))
+        return rows[0]["count(*)"], self.connection_manager.call(self.alias, lambda: collection.num_entities)
+
+    def iter_tickets(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every stored ticket (without its embedding)
+        """
+        self._ensure_loaded(self.tickets_collection)
+        iterator = self.tickets_collection.query_iterator(batch_size=batch_size, output_fields=TICKET_OUTPUT_FIELDS)
+        while True:
+            rows = iterator.next()
+            if not rows:
+                iterator.close()
+                break
+            for row in rows:
+                if row.get("affected_components"):
+                    row["affected_components"] = json.loads(row["affected_components"])
+                yield row
+
+    def _team_member_columns(self, members: List[Dict[str, Any]], embeddings: List[List[float]]) -> List[List[Any]]:
+        """Build column arrays in team knowledge schema order"""
+        return [
+            [m["id"] for m in members],
+            [m["employee_id"] for m in members],
+            [m["name"] for m in members],
+            [m["role"] for m in members],
+            [json.dumps(m["skills"]) for m in members],
+            [json.dumps(m["certifications"]) for m in members],
+            [json.dumps(m["resolved_issues"]) for m in members],
+            [m["experience_years"] for m in members],
+            [m["region"] for m in members],
+            list(embeddings)
+        ] + self._hash_column(self.team_knowledge_collection, members)
 
     def insert_team_member(self, member_data: Dict[str, Any], embedding: List[float]):
-        self.team_knowledge_collection.insert([
-            [member_data["id"]],
-            [member_data["employee_id"]],
-            [member_data["name"]],
-            [member_data["role"]],
-            [json.dumps(member_data["skills"])],
-            [json.dumps(member_data["certifications"])],
-            [json.dumps(member_data["resolved_issues"])],
-            [member_data["experience_years"]],
-            [member_data["region"]],
-            [embedding]
-        ])
+        self.team_knowledge_collection.insert(self._team_member_columns([member_data], [embedding]))
+
+    def insert_team_members(self, members: List[Dict[str, Any]], embeddings: List[List[float]], batch_size: int = None) -> int:
+        """
+        Bulk insert team members with their embeddings, sending chunked column inserts and a single flush
+        """
+        if len(members) != len(embeddings):
+            raise ValueError("members and embeddings must have the same length")
+        return self._bulk_insert(self.team_knowledge_collection, self._team_member_columns(members, embeddings), batch_size)
+
+    def upsert_team_members(self, members: List[Dict[str, Any]], embeddings: List[List[float]], batch_size: int = None) -> int:
+        """
+        Insert or replace team members keyed by their primary key (the employee_id)
+        """
+        if len(members) != len(embeddings):
+            raise ValueError("members and embeddings must have the same length")
+        return self._bulk_insert(self.team_knowledge_collection, self._team_member_columns(members, embeddings), batch_size, upsert=True)
 
     def search_similar_team_members(self, embedding: List[float], limit: int = 5):
-        self.team_knowledge_collection.load()
-        search_params = {
-            "metric_type": "L2",
-            "params": {"nprobe": 10}
-        }
-        results = self.team_knowledge_collection.search(
-            data=[embedding],
-            anns_field="embedding",
-            param=search_params,
-            limit=limit,
-            output_fields=["id", "employee_id", "name", "role", "skills", "certifications", 
-                         "resolved_issues", "experience_years", "region"]
-        )
+        self._ensure_loaded(self.team_knowledge_collection)
+        search_params = get_search_params()
+        with self.connection_manager.search_slot(self.alias):
+            results = self.connection_manager.call(self.alias, lambda: self.team_knowledge_collection.search(
+                data=[embedding],
+                anns_field="embedding",
+                param=search_params,
+                limit=limit,
+                output_fields=TEAM_MEMBER_OUTPUT_FIELDS
+            ))
         
         # Parse JSON strings back to lists
         for hits in results:
@@ -194,4 +643,50 @@ class MilvusClient:
         return results
 
     def close(self):
-        connections.disconnect("default") 
\ No newline at end of file
+        if self.alias is not None:
+            self.connection_manager.release(self.alias)
+            self.alias = None 
+
+class AsyncMilvusClient:
+    """
+    Async counterpart of MilvusClient. pymilvus calls are blocking, so they run on a
+    bounded thread pool instead of on the event loop.
+    """
+    def __init__(self, client: Optional[MilvusClient] = None, max_workers: Optional[int] = None):
+        self.client = client or MilvusClient()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.MILVUS_EXECUTOR_WORKERS,
+            thread_name_prefix="milvus"
+        )
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def insert_tickets(self, tickets: List[Dict[str, Any]], embeddings: List[List[float]], batch_size: int = None) -> int:
+        return await self._run(self.client.insert_tickets, tickets, embeddings, batch_size)
+
+    async def insert_team_members(self, members: List[Dict[str, Any]], embeddings: List[List[float]], batch_size: int = None) -> int:
+        return await self._run(self.client.insert_team_members, members, embeddings, batch_size)
+
+    async def upsert_tickets(self, tickets: List[Dict[str, Any]], embeddings: List[List[float]], batch_size: int = None) -> int:
+        return await self._run(self.client.upsert_tickets, tickets, embeddings, batch_size)
+
+    async def delete_tickets(self, ticket_ids: List[str]) -> int:
+        return await self._run(self.client.delete_tickets, ticket_ids)
+
+    async def search_similar_tickets(self, embedding: List[float], limit: int = 5, **filters) -> List[Dict[str, Any]]:
+        return await self._run(self.client.search_similar_tickets, embedding, limit, **filters)
+
+    async def search_similar_tickets_batch(self, embeddings: List[List[float]], limit: int = 5, **filters) -> List[List[Dict[str, Any]]]:
+        return await self._run(self.client.search_similar_tickets_batch, embeddings, limit, **filters)
+
+    async def search_similar_team_members(self, embedding: List[float], limit: int = 5):
+        return await self._run(self.client.search_similar_team_members, embedding, limit)
+
+    async def health(self) -> Dict[str, Any]:
+        return await self._run(self.client.health)
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+        self.client.close()
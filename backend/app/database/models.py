@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 class TicketBase(BaseModel):
@@ -40,9 +40,27 @@ class TeamMemberResponse(TeamMemberBase):
 
 class IssueDescription(BaseModel):
     ticket_text: str
+    # Machine and time of the issue; when given, its recorded sensor anomalies ground the diagnosis
+    machine_id: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+class BatchIssueDescription(BaseModel):
+    issues: List[IssueDescription]
 
 class Feedback(BaseModel):
     ticket_id: str
     feedback_score: int
     feedback_text: Optional[str]
-    suggested_improvements: Optional[str] 
\ No newline at end of file
+    suggested_improvements: Optional[str] 
+
+class Diagnosis(BaseModel):
+    summary: str = Field(description="A brief summary of the issue")
+    suggested_fix: str = Field(description="Suggested solution based on similar cases")
+    confidence: float = Field(ge=0.0, le=1.0, description="Confidence score between 0 and 1")
+    source_case: str = Field(description="Ticket ID of the most relevant past case")
+
+class DiagnosisResponse(Diagnosis):
+    # True when the model output could not be validated and fields were salvaged from it
+    partial: bool = False
+    # Summary of the sensor anomalies the diagnosis was grounded on, if any
+    anomalies: Optional[Dict[str, Any]] = None
@@ -0,0 +1,145 @@
+import threading
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from loguru import logger
+from app.core.embeddings import EmbeddingGenerator, AsyncEmbeddingGenerator, EmbeddingPipeline
+from app.core.ingestion import BulkIngestor
+from app.core.jobs import IngestionJobStore, IngestionWorkerPool
+from app.core.rag import AsyncRAGEngine
+from app.config import get_settings
+from app.database.milvus import MilvusClient, AsyncMilvusClient
+
+class ServiceContainer:
+    """
+    Lazily created, process-wide clients shared by every router. Nothing connects to
+    Milvus or OpenAI until a request first needs it, and each client is built once.
+    Tests can assign stand-ins to the underscored attributes before first use.
+    """
+    def __init__(self):
+        self._milvus_client: Optional[MilvusClient] = None
+        self._async_milvus_client: Optional[AsyncMilvusClient] = None
+        self._embedding_generator: Optional[EmbeddingGenerator] = None
+        self._async_embedding_generator: Optional[AsyncEmbeddingGenerator] = None
+        self._embedding_pipeline: Optional[EmbeddingPipeline] = None
+        self._rag_engine: Optional[AsyncRAGEngine] = None
+        self._ingestion_workers: Optional[IngestionWorkerPool] = None
+        # Startup warm-up and threadpool-resolved dependencies may build the same client
+        # at once; reentrant because building one client can build the clients it wraps
+        self._lock = threading.RLock()
+
+    @property
+    def milvus_client(self) -> MilvusClient:
+        if self._milvus_client is None:
+            with self._lock:
+                if self._milvus_client is None:
+                    self._milvus_client = MilvusClient()
+        return self._milvus_client
+
+    @property
+    def async_milvus_client(self) -> AsyncMilvusClient:
+        if self._async_milvus_client is None:
+            with self._lock:
+                if self._async_milvus_client is None:
+                    self._async_milvus_client = AsyncMilvusClient(self.milvus_client)
+        return self._async_milvus_client
+
+    @property
+    def embedding_generator(self) -> EmbeddingGenerator:
+        if self._embedding_generator is None:
+            with self._lock:
+                if self._embedding_generator is None:
+                    self._embedding_generator = EmbeddingGenerator()
+        return self._embedding_generator
+
+    @property
+    def async_embedding_generator(self) -> AsyncEmbeddingGenerator:
+        if self._async_embedding_generator is None:
+            with self._lock:
+                if self._async_embedding_generator is None:
+                    self._async_embedding_generator = AsyncEmbeddingGenerator()
+        return self._async_embedding_generator
+
+    @property
+    def embedding_pipeline(self) -> EmbeddingPipeline:
+        if self._embedding_pipeline is None:
+            with self._lock:
+                if self._embedding_pipeline is None:
+                    self._embedding_pipeline = EmbeddingPipeline(self.embedding_generator)
+        return self._embedding_pipeline
+
+    @property
+    def rag_engine(self) -> AsyncRAGEngine:
+        if self._rag_engine is None:
+            with self._lock:
+                if self._rag_engine is None:
+                    self._rag_engine = AsyncRAGEngine(self.async_milvus_client, self.async_embedding_generator)
+        return self._rag_engine
+
+    @property
+    def ingestion_workers(self) -> IngestionWorkerPool:
+        if self._ingestion_workers is None:
+            with self._lock:
+                if self._ingestion_workers is None:
+                    settings = get_settings()
+                    self._ingestion_workers = IngestionWorkerPool(
+                        IngestionJobStore(settings.INGEST_JOBS_DB_PATH),
+                        # Built on the first job: shares the Milvus client but not the request-path embedding pipeline
+                        lambda: BulkIngestor(
+                            milvus_client=self.milvus_client,
+                            embedding_pipeline=EmbeddingPipeline(self.embedding_generator, max_workers=settings.INGEST_EMBEDDING_CONCURRENCY)
+                        ),
+                        workers=settings.INGEST_WORKERS,
+                        heartbeat_interval=settings.INGEST_JOB_HEARTBEAT_SECONDS,
+                        stale_after=settings.INGEST_JOB_STALE_SECONDS
+                    )
+        return self._ingestion_workers
+
+    async def warm_up(self):
+        """
+        Build the RAG engine and its lexical index off the event loop, so the first
+        /diagnose request does not pay for paging every ticket out of Milvus. A
+        failure is logged and the load is retried by the first request.
+        """
+        try:
+            rag_engine = await run_in_threadpool(lambda: self.rag_engine)
+            await rag_engine.load_lexical_index()
+        except Exception as e:
+            logger.warning(f"RAG warm-up failed, retrying on first request: {e}")
+
+    async def close(self):
+        """Close every client that was created, in reverse dependency order"""
+        if self._ingestion_workers is not None:
+            await run_in_threadpool(self._ingestion_workers.stop)
+            self._ingestion_workers.store.close()
+        if self._rag_engine is not None:
+            await self._rag_engine.close()
+        if self._async_embedding_generator is not None:
+            await self._async_embedding_generator.close()
+        if self._embedding_generator is not None:
+            self._embedding_generator.close()
+        if self._async_milvus_client is not None:
+            await self._async_milvus_client.close()
+        elif self._milvus_client is not None:
+            self._milvus_client.close()
+
+def get_services(request: Request) -> ServiceContainer:
+    return request.app.state.services
+
+def get_milvus_client(request: Request) -> MilvusClient:
+    return get_services(request).milvus_client
+
+def get_async_milvus_client(request: Request) -> AsyncMilvusClient:
+    return get_services(request).async_milvus_client
+
+def get_async_embedding_generator(request: Request) -> AsyncEmbeddingGenerator:
+    return get_services(request).async_embedding_generator
+
+def get_embedding_pipeline(request: Request) -> EmbeddingPipeline:
+    return get_services(request).embedding_pipeline
+
+def get_rag_engine(request: Request) -> AsyncRAGEngine:
+    return get_services(request).rag_engine
+
+def get_ingestion_workers(request: Request) -> IngestionWorkerPool:
+    return get_services(request).ingestion_workers
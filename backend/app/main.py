@@ -1,7 +1,10 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
-from app.api.v1 import diagnose, kb, feedback
+from app.api.v1 import diagnose, kb, feedback, health
+from app.dependencies import ServiceContainer
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -9,9 +12,22 @@ load_dotenv()
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created lazily on first use and shared by every router
+    app.state.services = ServiceContainer()
+    # Upload jobs queued before a restart resume as soon as the app is up
+    app.state.services.ingestion_workers.start()
+    # Load the lexical index in the background; requests arriving first wait for the same load
+    warm_up = asyncio.create_task(app.state.services.warm_up())
+    yield
+    warm_up.cancel()
+    await app.state.services.close()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -27,6 +43,7 @@ app.add_middleware(
 app.include_router(diagnose.router, prefix=settings.API_V1_STR)
 app.include_router(kb.router, prefix=settings.API_V1_STR)
 app.include_router(feedback.router, prefix=settings.API_V1_STR)
+app.include_router(health.router, prefix=settings.API_V1_STR)
 
 @app.get("/")
 async def root():
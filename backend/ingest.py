@@ -0,0 +1,28 @@
+import argparse
+from app.core.ingestion import BulkIngestor, RECORD_KINDS
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream tickets or team members into Milvus in resumable, deduplicated batches")
+    parser.add_argument("kind", choices=list(RECORD_KINDS))
+    parser.add_argument("paths", nargs="+", help="JSON or JSON Lines source files")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--checkpoint-dir", default=None)
+    parser.add_argument("--restart", action="store_true", help="Ignore existing checkpoints and read each file from the start")
+    args = parser.parse_args()
+
+    ingestor = BulkIngestor(batch_size=args.batch_size, checkpoint_dir=args.checkpoint_dir)
+    try:
+        for path in args.paths:
+            stats = ingestor.ingest_file(
+                path,
+                args.kind,
+                resume=not args.restart,
+                progress=lambda s: print(f"{path}: {s['read']} read, {s['inserted']} inserted, {s['updated']} updated, {s['unchanged']} unchanged")
+            )
+            print(f"{path}: done, {stats['inserted']} inserted, {stats['updated']} updated, {stats['unchanged']} unchanged, "
+                  f"{stats['skipped_checkpoint']} skipped by checkpoint")
+    finally:
+        ingestor.milvus_client.close()
+
+if __name__ == "__main__":
+    main()
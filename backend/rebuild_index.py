@@ -0,0 +1,27 @@
+import argparse
+from app.database.indexes import INDEX_PROFILES
+from app.database.milvus import MilvusClient
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the vector index of a Milvus collection without downtime")
+    parser.add_argument("--collection", choices=["tickets", "team_knowledge"], default="tickets")
+    parser.add_argument("--profile", choices=list(INDEX_PROFILES), required=True)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--keep-old", action="store_true", help="Keep the previous physical collection instead of dropping it")
+    args = parser.parse_args()
+
+    milvus_client = MilvusClient()
+    try:
+        new_name = milvus_client.rebuild_index(
+            args.collection,
+            profile=args.profile,
+            batch_size=args.batch_size,
+            drop_old=not args.keep_old
+        )
+        print(f"'{args.collection}' now points at {new_name} with the '{args.profile}' index profile")
+        print(f"Set MILVUS_INDEX_PROFILE={args.profile} so searches use matching parameters")
+    finally:
+        milvus_client.close()
+
+if __name__ == "__main__":
+    main()
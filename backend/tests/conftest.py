@@ -0,0 +1,14 @@
+import os
+import sys
+
+# Settings require these; tests never reach a real Milvus or OpenAI
+for name, value in {
+    "MILVUS_HOST": "localhost",
+    "MILVUS_PORT": "19530",
+    "MILVUS_USER": "test",
+    "MILVUS_PASSWORD": "test",
+    "OPENAI_API_KEY": "test"
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
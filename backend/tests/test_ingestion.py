@@ -0,0 +1,56 @@
+import json
+import os
+import shutil
+from app.core.ingestion import BulkIngestor
+
+class FakeMilvusClient:
+    """Records upserts per collection and serves them back to fetch_records"""
+    def __init__(self):
+        self.collections = {"tickets": {}, "team_knowledge": {}}
+
+    def fetch_records(self, collection, ids, with_embedding=False):
+        stored = self.collections[collection]
+        return {id: stored[id] for id in ids if id in stored}
+
+    def upsert_tickets(self, records, embeddings):
+        self._upsert("tickets", records, embeddings)
+
+    def upsert_team_members(self, records, embeddings):
+        self._upsert("team_knowledge", records, embeddings)
+
+    def _upsert(self, collection, records, embeddings):
+        for record, embedding in zip(records, embeddings):
+            self.collections[collection][record["id"]] = {**record, "embedding": embedding}
+
+class FakeEmbeddingPipeline:
+    def embed(self, texts):
+        return [[float(len(text))] for text in texts]
+
+def make_source(tmp_path):
+    """A copy of the sample export, which holds both tickets and team members"""
+    sample = os.path.join(os.path.dirname(__file__), "..", "..", "kb_samples", "combined_data.json")
+    path = tmp_path / "combined_data.json"
+    shutil.copyfile(sample, path)
+    with open(path) as f:
+        data = json.load(f)
+    return str(path), len(data["tickets"]), len(data["team_members"])
+
+def test_kinds_from_one_file_keep_separate_checkpoints(tmp_path):
+    source, n_tickets, n_team = make_source(tmp_path)
+    milvus = FakeMilvusClient()
+    ingestor = BulkIngestor(milvus, FakeEmbeddingPipeline(), batch_size=7, checkpoint_dir=str(tmp_path / "checkpoints"))
+
+    tickets = ingestor.ingest_file(source, "tickets")
+    team = ingestor.ingest_file(source, "team_members")
+
+    assert tickets["inserted"] == n_tickets
+    assert team["read"] == n_team
+    assert team["skipped_checkpoint"] == 0
+    assert team["inserted"] == n_team
+    assert len(milvus.collections["tickets"]) == n_tickets
+    assert len(milvus.collections["team_knowledge"]) == n_team
+
+    # Each kind resumes from its own checkpoint
+    again = ingestor.ingest_file(source, "team_members")
+    assert again["skipped_checkpoint"] == n_team
+    assert again["inserted"] == 0
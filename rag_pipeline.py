@@ -4,7 +4,9 @@ from openai import OpenAI
 from pymilvus import connections, Collection, FieldSchema, CollectionSchema, DataType, utility
 import logging
 from app.config import get_settings
-import uuid
+from app.core.cache import get_embedding_cache
+from app.database.indexes import get_index_params, get_search_params
+import rag_utils
 from rag_utils import get_embedding, search_similar_tickets
 
 # Set up logging
@@ -14,6 +16,9 @@ logger = logging.getLogger(__name__)
 # Get settings
 settings = get_settings()
 
+# Share the backend's persistent embedding cache with rag_utils.get_embedding
+rag_utils.embedding_cache = get_embedding_cache()
+
 # Initialize OpenAI client
 try:
     client = OpenAI(api_key=settings.OPENAI_API_KEY)
@@ -68,11 +73,7 @@ def create_collection():
         collection = Collection(name=COLLECTION_NAME, schema=schema)
         
         # Create index on the embedding field
-        index_params = {
-            'metric_type': 'L2',
-            'index_type': 'IVF_FLAT',
-            'params': {'nlist': 1024}
-        }
+        index_params = get_index_params()
         collection.create_index(field_name='embedding', index_params=index_params)
         logger.info(f"Created collection {COLLECTION_NAME} with index")
         return collection
@@ -92,40 +93,58 @@ def load_tickets(file_path):
         raise
 
 # Ingest data into Milvus
-def ingest_tickets(tickets, collection):
+def ingest_tickets(tickets, collection, batch_size=100):
     try:
-        entities = []
-        for ticket in tickets:
-            # Create a text chunk from issue description and resolution
-            text_chunk = f'Issue: {ticket["issue_description"]}\nResolution: {ticket["resolution_solution"]}'
-            embedding = get_embedding(text_chunk)
-            entities.append({
-                'id': str(uuid.uuid4()),
-                'ticket_id': ticket['ticket_id'],
-                'machine_model': ticket['machine_model'],
-                'serial_number': ticket['serial_number'],
-                'issue_description': ticket['issue_description'],
-                'affected_components': json.dumps(ticket['affected_components']),
-                'customer': ticket['customer'],
-                'reported_date': ticket['reported_date'].isoformat(),
-                'priority': ticket['priority'],
-                'status': ticket['status'],
-                'resolution_solution': ticket.get('resolution_solution', ''),
-                'root_cause': ticket.get('root_cause', ''),
-                'resolution_date': ticket.get('resolution_date', '').isoformat() if ticket.get('resolution_date') else '',
-                'technician': ticket.get('technician', ''),
-                'embedding': embedding
-            })
-        
-        # Insert in batches to avoid memory issues
-        batch_size = 100
-        for i in range(0, len(entities), batch_size):
-            batch = entities[i:i + batch_size]
-            collection.insert(batch)
-            logger.info(f"Inserted batch {i//batch_size + 1}")
+        collection.load()
+        written = reused = 0
+        for batch_number, start in enumerate(range(0, len(tickets), batch_size), start=1):
+            batch = tickets[start:start + batch_size]
+            # Tickets are keyed by ticket_id: look up what is stored so unchanged text keeps its
+            # vector, and find copies stored under other ids by earlier runs
+            ticket_ids = [ticket['ticket_id'] for ticket in batch]
+            existing = collection.query(
+                expr=f"ticket_id in {json.dumps(ticket_ids)}",
+                output_fields=['id', 'ticket_id', 'issue_description', 'resolution_solution', 'embedding']
+            )
+            stale_ids = [row['id'] for row in existing if row['id'] != row['ticket_id']]
+            if stale_ids:
+                collection.delete(expr=f"id in {json.dumps(stale_ids)}")
+            stored = {row['ticket_id']: row for row in existing}
+
+            # Embed and upsert one batch at a time so memory stays bounded
+            entities = []
+            for ticket in batch:
+                # Create a text chunk from issue description and resolution
+                text_chunk = f'Issue: {ticket["issue_description"]}\nResolution: {ticket["resolution_solution"]}'
+                previous = stored.get(ticket['ticket_id'])
+                if previous is not None and f'Issue: {previous["issue_description"]}\nResolution: {previous["resolution_solution"]}' == text_chunk:
+                    embedding = previous['embedding']
+                    reused += 1
+                else:
+                    embedding = get_embedding(text_chunk)
+                entities.append({
+                    'id': ticket['ticket_id'],
+                    'ticket_id': ticket['ticket_id'],
+                    'machine_model': ticket['machine_model'],
+                    'serial_number': ticket['serial_number'],
+                    'issue_description': ticket['issue_description'],
+                    'affected_components': json.dumps(ticket['affected_components']),
+                    'customer': ticket['customer'],
+                    'reported_date': ticket['reported_date'].isoformat(),
+                    'priority': ticket['priority'],
+                    'status': ticket['status'],
+                    'resolution_solution': ticket.get('resolution_solution', ''),
+                    'root_cause': ticket.get('root_cause', ''),
+                    'resolution_date': ticket.get('resolution_date', '').isoformat() if ticket.get('resolution_date') else '',
+                    'technician': ticket.get('technician', ''),
+                    'embedding': embedding
+                })
+            collection.upsert(entities)
+            written += len(entities)
+            logger.info(f"Upserted batch {batch_number}")
         
         collection.flush()
-        logger.info(f"Successfully ingested {len(entities)} tickets")
+        logger.info(f"Successfully ingested {written} tickets ({reused} kept their stored embedding)")
     except Exception as e:
         logger.error(f"Failed to ingest tickets: {e}")
         raise
@@ -134,7 +153,7 @@ def ingest_tickets(tickets, collection):
 def search_similar_tickets(query_text, collection, top_k=3):
     try:
         query_embedding = get_embedding(query_text)
-        search_params = {'metric_type': 'L2', 'params': {'nprobe': 10}}
+        search_params = get_search_params()
         results = collection.search(
             data=[query_embedding],
             anns_field='embedding',
@@ -9,13 +9,25 @@ logger = logging.getLogger(__name__)
 # Initialize OpenAI client
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+EMBEDDING_MODEL = 'text-embedding-ada-002'
+
+# Optional app.core.cache.EmbeddingCache; set by callers that run with the backend on the path (see rag_pipeline.py)
+embedding_cache = None
+
 def get_embedding(text):
     try:
+        if embedding_cache is not None:
+            cached = embedding_cache.get(EMBEDDING_MODEL, text)
+            if cached is not None:
+                return cached
         response = client.embeddings.create(
-            model='text-embedding-ada-002',
+            model=EMBEDDING_MODEL,
             input=text
         )
-        return response.data[0].embedding
+        embedding = response.data[0].embedding
+        if embedding_cache is not None:
+            embedding_cache.set(EMBEDDING_MODEL, text, embedding)
+        return embedding
     except Exception as e:
         logger.error(f"Failed to generate embedding: {e}")
         raise
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import shutil
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+
+SENSOR_STORE_DIR = os.environ.get("SENSOR_STORE_DIR", "Data/sensor_store")
+
+
+def _to_ns(timestamps):
+    """Parse timestamps (strings, datetimes or epoch ns) into int64 UTC nanoseconds"""
+    if not len(timestamps):
+        return np.empty(0, dtype=np.int64)
+    # Pin the unit: pandas may otherwise pick second or microsecond resolution
+    return pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).as_unit("ns").asi8
+
+
+class SensorStore:
+    """
+    Columnar telemetry store partitioned by machine and UTC day:
+
+        <root>/<machine_id>/<YYYY-MM-DD>/timestamps.npy   int64 ns, sorted, unique
+        <root>/<machine_id>/<YYYY-MM-DD>/values.npy       float64, one column per sensor
+        <root>/<machine_id>/<YYYY-MM-DD>/columns.json     sensor names of the value columns
+
+    Partitions are opened memory-mapped and window queries binary-search the timestamp
+    array, so a query only pages in the rows it returns plus a few index pages.
+    """
+    def __init__(self, root=SENSOR_STORE_DIR):
+        self.root = root
+
+    # Writing
+    def ingest_json(self, path):
+        """
+        Ingest a Machine_Sensor_Data.json-style file ({machine_id: [{timestamp, sensors}]})
+        or a JSON Lines file of {"machine_id", "timestamp", "sensors"} readings.
+        Returns the number of readings per machine.
+        """
+        if path.endswith((".jsonl", ".ndjson")):
+            with open(path) as f:
+                return self.ingest_readings(json.loads(line) for line in f if line.strip())
+        with open(path) as f:
+            data = json.load(f)
+        return self.ingest_readings(
+            {"machine_id": machine_id, **record} for machine_id, records in data.items() for record in records
+        )
+
+    def ingest_readings(self, readings, flush_every=100000):
+        """
+        Append readings ({"machine_id", "timestamp", "sensors"}), merging them into the
+        day partitions they fall in. Later readings with the same timestamp win.
+        """
+        buffers = defaultdict(list)
+        counts = defaultdict(int)
+        buffered = 0
+        for reading in readings:
+            buffers[reading["machine_id"]].append(reading)
+            counts[reading["machine_id"]] += 1
+            buffered += 1
+            if buffered >= flush_every:
+                self._flush(buffers)
+                buffers.clear()
+                buffered = 0
+        self._flush(buffers)
+        return dict(counts)
+
+    def _flush(self, buffers):
+        for machine_id, readings in buffers.items():
+            frame = pd.DataFrame([reading["sensors"] for reading in readings], dtype=float)
+            frame.index = pd.to_datetime(_to_ns([reading["timestamp"] for reading in readings]), utc=True)
+            for day, day_frame in frame.groupby(frame.index.floor("D")):
+                self._merge_partition(machine_id, day.strftime("%Y-%m-%d"), day_frame)
+
+    def _merge_partition(self, machine_id, day, frame):
+        directory = self._partition_dir(machine_id, day)
+        existing = self._read_partition(machine_id, day)
+        if existing is not None:
+            frame = pd.concat([existing, frame])
+        frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+
+        tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "timestamps.npy"), frame.index.as_unit("ns").asi8)
+        np.save(os.path.join(tmp_dir, "values.npy"), frame.to_numpy(dtype=float))
+        with open(os.path.join(tmp_dir, "columns.json"), "w") as f:
+            json.dump(list(frame.columns), f)
+        # Swap the whole partition directory so readers never see half a write
+        old_dir = f"{directory}.old"
+        if os.path.exists(directory):
+            os.replace(directory, old_dir)
+        os.replace(tmp_dir, directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    # Reading
+    def machines(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def days(self, machine_id):
+        directory = os.path.join(self.root, machine_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory) if len(name) == 10 and not name.endswith((".tmp", ".old")))
+
+    def _partition_dir(self, machine_id, day):
+        return os.path.join(self.root, machine_id, day)
+
+    def _open_partition(self, machine_id, day):
+        """Memory-map a partition: (timestamps, values, columns), or None if it does not exist"""
+        directory = self._partition_dir(machine_id, day)
+        if not os.path.exists(os.path.join(directory, "timestamps.npy")):
+            return None
+        timestamps = np.load(os.path.join(directory, "timestamps.npy"), mmap_mode="r")
+        values = np.load(os.path.join(directory, "values.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "columns.json")) as f:
+            columns = json.load(f)
+        return timestamps, values, columns
+
+    def _read_partition(self, machine_id, day, lo=None, hi=None):
+        partition = self._open_partition(machine_id, day)
+        if partition is None:
+            return None
+        timestamps, values, columns = partition
+        lo = 0 if lo is None else lo
+        hi = len(timestamps) if hi is None else hi
+        return pd.DataFrame(
+            np.array(values[lo:hi]),
+            index=pd.DatetimeIndex(pd.to_datetime(np.array(timestamps[lo:hi]), utc=True), name="timestamp"),
+            columns=columns
+        )
+
+    def query(self, machine_id, start, end, columns=None):
+        """
+        Readings of one machine with start <= timestamp <= end, as a DataFrame indexed by
+        timestamp (UTC). Only the day partitions overlapping the range are opened.
+        """
+        start_ns, end_ns = _to_ns([start, end])
+        first_day = pd.Timestamp(start_ns, tz="UTC").strftime("%Y-%m-%d")
+        last_day = pd.Timestamp(end_ns, tz="UTC").strftime("%Y-%m-%d")
+        frames = []
+        for day in self.days(machine_id):
+            if day < first_day or day > last_day:
+                continue
+            partition = self._open_partition(machine_id, day)
+            if partition is None:
+                continue
+            timestamps = partition[0]
+            lo = int(np.searchsorted(timestamps, start_ns, side="left"))
+            hi = int(np.searchsorted(timestamps, end_ns, side="right"))
+            if hi > lo:
+                frames.append(self._read_partition(machine_id, day, lo, hi))
+        return self._combine(frames, columns)
+
+    def tail_before(self, machine_id, timestamp, count, columns=None):
+        """
+        The last `count` readings strictly before timestamp (e.g. to seed rolling statistics)
+        """
+        (ts_ns,) = _to_ns([timestamp])
+        last_day = pd.Timestamp(ts_ns, tz="UTC").strftime("%Y-%m-%d")
+        frames = []
+        remaining = count
+        for day in reversed(self.days(machine_id)):
+            if remaining <= 0:
+                break
+            if day > last_day:
+                continue
+            partition = self._open_partition(machine_id, day)
+            if partition is None:
+                continue
+            hi = int(np.searchsorted(partition[0], ts_ns, side="left"))
+            lo = max(hi - remaining, 0)
+            if hi > lo:
+                frames.insert(0, self._read_partition(machine_id, day, lo, hi))
+                remaining -= hi - lo
+        return self._combine(frames, columns)
+
+    def load_machine(self, machine_id, columns=None):
+        """Full history of one machine (for fitting baselines)"""
+        return self._combine([self._read_partition(machine_id, day) for day in self.days(machine_id)], columns)
+
+    @staticmethod
+    def _combine(frames, columns=None):
+        frames = [frame for frame in frames if frame is not None and len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=columns or [], index=pd.DatetimeIndex([], tz="UTC", name="timestamp"))
+        # Partitions written at different times may carry different sensor sets
+        df = pd.concat(frames)
+        return df.reindex(columns=columns) if columns is not None else df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar sensor telemetry store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest = subparsers.add_parser("ingest", help="Ingest JSON or JSON Lines sensor exports")
+    ingest.add_argument("paths", nargs="+")
+    window = subparsers.add_parser("window", help="Print the readings around a timestamp")
+    window.add_argument("machine_id")
+    window.add_argument("timestamp")
+    window.add_argument("--minutes", type=int, default=15)
+    parser.add_argument("--root", default=SENSOR_STORE_DIR)
+    args = parser.parse_args()
+
+    store = SensorStore(args.root)
+    if args.command == "ingest":
+        for path in args.paths:
+            counts = store.ingest_json(path)
+            print(f"{path}: " + ", ".join(f"{machine_id} {count}" for machine_id, count in counts.items()))
+    else:
+        center = pd.to_datetime(args.timestamp, utc=True)
+        delta = pd.Timedelta(minutes=args.minutes)
+        print(store.query(args.machine_id, center - delta, center + delta))
+
+
+if __name__ == "__main__":
+    main()